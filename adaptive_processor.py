@@ -15,6 +15,7 @@ import sys
 import os
 import json
 import time
+from itertools import islice
 from pathlib import Path
 from datetime import datetime
 from hardware_configs import get_hardware_config, optimize_for_queue_issues, diagnose_dataset_configuration
@@ -54,8 +55,12 @@ class AdaptiveProcessor:
 
     def estimate_dataset_size(self, input_dir: str) -> dict:
         """Estima el tamaño y características del dataset"""
-        input_path = Path(input_dir)
-        files = list(input_path.glob("*.jsonl"))
+        # os.scandir: DirEntry cachea el tipo de entrada, sin construir un Path por archivo
+        files = []
+        if os.path.isdir(input_dir):
+            with os.scandir(input_dir) as entries:
+                files = [entry for entry in entries
+                         if entry.name.endswith('.jsonl') and entry.is_file(follow_symlinks=False)]
         
         if not files:
             return {'total_articles': 0, 'total_files': 0, 'total_size_gb': 0}
@@ -73,17 +78,13 @@ class AdaptiveProcessor:
                 file_size = file_path.stat().st_size
                 total_size_bytes += file_size
                 
-                sample_count = 0
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    for line_num, line in enumerate(f):
-                        if line.strip():
-                            sample_count += 1
-                        if line_num >= 999:  # Muestra de 1000 líneas
-                            break
+                with open(file_path, 'rb') as f:  # Solo se cuentan líneas: sin decodificar UTF-8
+                    sample_lines = list(islice(f, 1000))  # Muestra de 1000 líneas
+                sample_count = sum(1 for line in sample_lines if line.strip())
                 
                 # Extrapolar para el archivo completo
                 if sample_count > 0:
-                    lines_per_byte = sample_count / (file_size * min(1000, line_num + 1) / 1000)
+                    lines_per_byte = sample_count / (file_size * len(sample_lines) / 1000)
                     estimated_in_file = int(file_size * lines_per_byte)
                     total_articles += estimated_in_file
                     
@@ -18,10 +18,157 @@ MEJORAS IMPLEMENTADAS:
 import re
 import json
 import hashlib
+import heapq
 import math
 from typing import Dict, List, Tuple, Optional, Any
 from collections import defaultdict, Counter
 from datetime import datetime
+from operator import itemgetter
+
+from json_utils import dumps_compact
+
+
+def _compile_any(patterns: List[str]) -> 're.Pattern':
+    """Une varios patrones en una sola alternancia: una pasada sobre el texto en vez de una por patrón"""
+    return re.compile('|'.join(f'(?:{pattern})' for pattern in patterns), re.IGNORECASE)
+
+
+# Patrones de análisis temporal (es/fue), compilados una vez por proceso
+DECEASED_PATTERN = _compile_any([
+    r'\b(?:murió|falleció|fallecido|muerto|†)\b',
+    r'\b\d{4}\s*[-–]\s*\d{4}\b',  # Años de nacimiento-muerte
+    r'\b(?:difunto|finado|extinto)\b',
+    r'\b(?:fue enterrado|fue sepultado)\b',
+    r'\b(?:su muerte|su fallecimiento)\b'
+])
+
+ORGANIZATION_PATTERN = _compile_any([
+    r'\b(?:empresa|corporación|compañía|organización)\b',
+    r'\b(?:fundada|creada|establecida) en\b',
+    r'\b(?:club|equipo|banda|grupo)\b',
+    r'\b(?:partido|movimiento|asociación)\b',
+    r'\b(?:gobierno|ministerio|departamento)\b'
+])
+
+DEFUNCT_ORGANIZATION_PATTERN = _compile_any([
+    r'\b(?:desaparecida|extinta|disuelta|cerrada)\b',
+    r'\b(?:fue disuelta|fue cerrada|cesó sus operaciones)\b',
+    r'\b(?:hasta \d{4}|terminó en \d{4})\b',
+    r'\b(?:ya no existe|no existe más)\b',
+    r'\b(?:ex-|antigua|former)\b',
+    r'\b\d{4}\s*[-–]\s*\d{4}\b',  # Años de inicio-fin
+    r'\b(?:quebró|en bancarrota|liquidada)\b'
+])
+
+HISTORICAL_EVENT_PATTERN = _compile_any([
+    r'\b(?:guerra|batalla|revolución|conflicto)\b',
+    r'\b(?:siglo|año|época|era)\b.*\b(?:XVIII|XIX|XX|XXI|\d{4})\b',
+    r'\b(?:acontecimiento|evento|suceso) (?:histórico|importante)\b'
+])
+
+
+# Palabras clave por categoría para la confianza de categorización
+CATEGORY_KEYWORDS = {
+    'arte': ('música', 'álbum', 'canción', 'pintura', 'artista', 'obra'),
+    'geografia': ('ciudad', 'país', 'región', 'provincia', 'territorio'),
+    'historia': ('nació', 'murió', 'siglo', 'guerra', 'batalla', 'histórico'),
+    'biologia': ('especie', 'género', 'familia', 'animal', 'planta'),
+    'ciencias': ('teoría', 'investigación', 'científico', 'descubrimiento'),
+    'deportes': ('equipo', 'club', 'liga', 'campeonato', 'deportivo'),
+    'politica': ('gobierno', 'presidente', 'político', 'partido'),
+    'tecnologia': ('software', 'internet', 'tecnología', 'digital'),
+    'medicina': ('enfermedad', 'tratamiento', 'médico', 'hospital'),
+    'economia': ('empresa', 'mercado', 'economía', 'negocio'),
+    'educacion': ('universidad', 'escuela', 'educación', 'enseñanza')
+}
+
+# Explicaciones de cada categoría para la categoría consciencia
+CATEGORY_EXPLANATIONS = {
+    'arte': {
+        'description': 'Creaciones y expresiones culturales humanas',
+        'scope': 'Música, pintura, literatura, teatro, danza, escultura, arquitectura, cine y todas las formas de expresión artística',
+        'content_types': 'Biografías de artistas, obras específicas, movimientos artísticos, técnicas, historia del arte',
+        'importance': 'representa la creatividad y expresión cultural de la humanidad a lo largo de la historia',
+        'examples': 'pintores famosos, álbumes musicales, obras literarias, películas, esculturas, movimientos artísticos'
+    },
+    'geografia': {
+        'description': 'Estudio de lugares, territorios y características terrestres',
+        'scope': 'Países, ciudades, regiones, características físicas, demografía, clima, recursos naturales',
+        'content_types': 'Información sobre lugares, datos demográficos, características geográficas, recursos naturales',
+        'importance': 'nos ayuda a entender nuestro mundo, ubicaciones, culturas y características territoriales',
+        'examples': 'países, ciudades, montañas, ríos, regiones, capitales, fronteras'
+    },
+    'historia': {
+        'description': 'Registro y análisis de eventos y personalidades del pasado',
+        'scope': 'Biografías, eventos históricos, períodos, civilizaciones, guerras, revoluciones',
+        'content_types': 'Biografías de personajes históricos, descripciones de eventos, análisis de períodos',
+        'importance': 'preserva la memoria humana y nos ayuda a entender el presente a través del pasado',
+        'examples': 'personajes históricos, guerras, revoluciones, imperios, descubrimientos, fechas importantes'
+    },
+    'ciencias': {
+        'description': 'Conocimiento sistemático sobre el mundo natural y técnico',
+        'scope': 'Física, química, matemáticas, investigación, teorías, descubrimientos científicos',
+        'content_types': 'Teorías científicas, biografías de científicos, experimentos, descubrimientos',
+        'importance': 'expande nuestro entendimiento del universo y permite el progreso tecnológico',
+        'examples': 'teorías científicas, científicos famosos, experimentos, descubrimientos, leyes naturales'
+    },
+    'biologia': {
+        'description': 'Estudio de los seres vivos y sus procesos',
+        'scope': 'Especies animales y vegetales, ecosistemas, evolución, genética, anatomía',
+        'content_types': 'Descripciones de especies, información sobre ecosistemas, procesos biológicos',
+        'importance': 'nos ayuda a entender la vida en todas sus formas y nuestra relación con otros seres vivos',
+        'examples': 'especies animales, plantas, ecosistemas, procesos evolutivos, características biológicas'
+    },
+    'tecnologia': {
+        'description': 'Herramientas, sistemas y procesos técnicos',
+        'scope': 'Computación, internet, software, hardware, innovaciones tecnológicas',
+        'content_types': 'Información sobre tecnologías, empresas tecnológicas, innovaciones',
+        'importance': 'transforma la manera en que vivimos, trabajamos y nos comunicamos',
+        'examples': 'computadoras, software, internet, aplicaciones, empresas tecnológicas'
+    },
+    'deportes': {
+        'description': 'Actividades físicas competitivas y recreativas',
+        'scope': 'Diferentes disciplinas deportivas, equipos, competiciones, atletas',
+        'content_types': 'Información sobre deportes, equipos, atletas, competiciones, reglas',
+        'importance': 'promueve la salud, la competencia sana y la unión social a través del deporte',
+        'examples': 'fútbol, basketball, olimpiadas, equipos deportivos, atletas famosos'
+    },
+    'politica': {
+        'description': 'Organización del poder y gobierno en las sociedades',
+        'scope': 'Gobiernos, políticos, partidos, sistemas políticos, elecciones',
+        'content_types': 'Biografías de políticos, información sobre gobiernos, sistemas políticos',
+        'importance': 'define cómo se organizan las sociedades y se toman decisiones colectivas',
+        'examples': 'presidentes, gobiernos, partidos políticos, elecciones, sistemas de gobierno'
+    },
+    'medicina': {
+        'description': 'Ciencia y práctica de la salud humana',
+        'scope': 'Enfermedades, tratamientos, anatomía, medicina preventiva, investigación médica',
+        'content_types': 'Información sobre enfermedades, tratamientos, procedimientos médicos',
+        'importance': 'preserva y mejora la salud humana, combate enfermedades y extiende la vida',
+        'examples': 'enfermedades, tratamientos, medicamentos, procedimientos médicos, especialidades médicas'
+    },
+    'economia': {
+        'description': 'Sistemas de producción, distribución y consumo',
+        'scope': 'Empresas, mercados, comercio, finanzas, sistemas económicos',
+        'content_types': 'Información sobre empresas, mercados, teorías económicas, sistemas financieros',
+        'importance': 'organiza los recursos y la actividad económica de las sociedades',
+        'examples': 'empresas, mercados, monedas, comercio, sistemas económicos'
+    },
+    'educacion': {
+        'description': 'Procesos de enseñanza y aprendizaje',
+        'scope': 'Instituciones educativas, métodos pedagógicos, sistemas educativos',
+        'content_types': 'Información sobre universidades, escuelas, métodos educativos, pedagogía',
+        'importance': 'transmite conocimiento y habilidades para el desarrollo personal y social',
+        'examples': 'universidades, escuelas, métodos de enseñanza, sistemas educativos'
+    },
+    'general': {
+        'description': 'Conocimiento diverso que no se limita a categorías específicas',
+        'scope': 'Temas variados, conceptos multidisciplinarios, información general',
+        'content_types': 'Información diversa, conceptos generales, temas multidisciplinarios',
+        'importance': 'abarca conocimiento que conecta diferentes áreas y proporciona contexto general',
+        'examples': 'conceptos generales, temas multidisciplinarios, información diversa'
+    }
+}
 
 
 class TitleInferenceEngine:
@@ -250,23 +397,33 @@ class ConfidenceMetrics:
     def __init__(self):
         self.metrics_history = []
         self.low_confidence_articles = []
+        self.issue_counts = Counter()  # Se actualiza al registrar cada artículo de baja confianza
+        
+        # Métricas que no dependen de la pregunta, memorizadas para el último artículo
+        self._article_cache = (None, None, None, None, None)  # (title, content, category, scores, timestamp)
         
     def calculate_confidence(self, title: str, content: str, category: str, 
                            subcategory: str, question_type: str) -> Dict[str, float]:
         """Calcula múltiples métricas de confianza"""
         
-        # 1. Confianza de categorización (basada en keywords y patterns)
-        category_confidence = self._calculate_category_confidence(content, category)
+        # 1, 3 y 4 dependen solo del artículo: se reutilizan entre sus preguntas
+        cached_title, cached_content, cached_category, article_scores, timestamp = self._article_cache
+        if title != cached_title or content is not cached_content or category != cached_category:
+            article_scores = (
+                # 1. Confianza de categorización (basada en keywords y patterns)
+                self._calculate_category_confidence(content, category),
+                # 3. Confianza de calidad de contenido
+                self._calculate_content_confidence(content),
+                # 4. Confianza de especificidad del título
+                self._calculate_title_confidence(title)
+            )
+            timestamp = datetime.now().isoformat()  # Un sello por artículo, no por pregunta
+            self._article_cache = (title, content, category, article_scores, timestamp)
+        category_confidence, content_confidence, title_confidence = article_scores
         
         # 2. Confianza de tipo de pregunta
         question_confidence = self._calculate_question_confidence(title, question_type)
         
-        # 3. Confianza de calidad de contenido
-        content_confidence = self._calculate_content_confidence(content)
-        
-        # 4. Confianza de especificidad del título
-        title_confidence = self._calculate_title_confidence(title)
-        
         # 5. Confianza global (promedio ponderado)
         global_confidence = (
             category_confidence * 0.3 +
@@ -290,40 +447,28 @@ class ConfidenceMetrics:
             'title': title,
             'category': category,
             'metrics': metrics,
-            'timestamp': datetime.now().isoformat()
+            'timestamp': timestamp
         })
         
         # Identificar artículos de baja confianza
         if global_confidence < 0.6:
+            issues = self._identify_issues(metrics)
+            self.issue_counts.update(issues)
             self.low_confidence_articles.append({
                 'title': title,
                 'category': category,
                 'confidence': global_confidence,
-                'issues': self._identify_issues(metrics)
+                'issues': issues
             })
         
         return metrics
     
     def _calculate_category_confidence(self, content: str, category: str) -> float:
         """Confianza de la categorización"""
-        category_keywords = {
-            'arte': ['música', 'álbum', 'canción', 'pintura', 'artista', 'obra'],
-            'geografia': ['ciudad', 'país', 'región', 'provincia', 'territorio'],
-            'historia': ['nació', 'murió', 'siglo', 'guerra', 'batalla', 'histórico'],
-            'biologia': ['especie', 'género', 'familia', 'animal', 'planta'],
-            'ciencias': ['teoría', 'investigación', 'científico', 'descubrimiento'],
-            'deportes': ['equipo', 'club', 'liga', 'campeonato', 'deportivo'],
-            'politica': ['gobierno', 'presidente', 'político', 'partido'],
-            'tecnologia': ['software', 'internet', 'tecnología', 'digital'],
-            'medicina': ['enfermedad', 'tratamiento', 'médico', 'hospital'],
-            'economia': ['empresa', 'mercado', 'economía', 'negocio'],
-            'educacion': ['universidad', 'escuela', 'educación', 'enseñanza']
-        }
-        
-        if category not in category_keywords:
+        keywords = CATEGORY_KEYWORDS.get(category)
+        if keywords is None:
             return 0.5
         
-        keywords = category_keywords[category]
         content_lower = content.lower()
         
         matches = sum(1 for keyword in keywords if keyword in content_lower)
@@ -401,11 +546,7 @@ class ConfidenceMetrics:
     
     def _get_common_issues(self) -> Dict[str, int]:
         """Analiza problemas más comunes"""
-        issue_counts = Counter()
-        for article in self.low_confidence_articles:
-            for issue in article['issues']:
-                issue_counts[issue] += 1
-        return dict(issue_counts.most_common(10))
+        return dict(self.issue_counts.most_common(10))
     
     def _get_recommendations(self) -> List[str]:
         """Genera recomendaciones de mejora"""
@@ -555,6 +696,30 @@ class IntelligentCategorizer:
             r'\b(?:estilo|movimiento)\b.*\b(?:artístico|pictórico)\b'
         ]
         
+        # Keywords normalizados con casefold y regex compiladas una sola vez (no por artículo)
+        for config in self.categories.values():
+            config['keywords'] = tuple(keyword.casefold() for keyword in config['keywords'])
+            config['patterns'] = [re.compile(pattern, re.IGNORECASE) for pattern in config['patterns']]
+        self.music_patterns = [re.compile(pattern, re.IGNORECASE) for pattern in self.music_patterns]
+        self.art_patterns = [re.compile(pattern, re.IGNORECASE) for pattern in self.art_patterns]
+        
+        # Orden de evaluación guiado por perfil: 'rank' conserva el orden de declaración
+        # para desempatar igual que el recorrido original
+        for rank, config in enumerate(self.categories.values()):
+            config['rank'] = rank
+            config['pattern_bonus'] = 3 * len(config['patterns'])
+        self.category_order = list(self.categories.items())
+        self.category_hits = Counter()
+        self.articles_since_reorder = 0
+        
+    def reorder_categories_by_profile(self):
+        """Reordena las categorías poniendo primero las más frecuentes del perfil"""
+        hot = [category for category, _ in self.category_hits.most_common() if category in self.categories]
+        hot_set = set(hot)
+        self.category_order = [(category, self.categories[category]) for category in hot]
+        self.category_order += [item for item in self.categories.items() if item[0] not in hot_set]
+        self.articles_since_reorder = 0
+    
     def setup_conversation_templates(self):
         """Plantillas inteligentes basadas en tipo de contenido con preguntas en profundidad"""
         self.conversation_templates = {
@@ -728,29 +893,36 @@ class IntelligentCategorizer:
             }
         }
         
+        # Compilar una sola vez
+        for patterns in self.subcategory_patterns.values():
+            for subcategory, pattern in patterns.items():
+                patterns[subcategory] = re.compile(pattern, re.IGNORECASE)
+        
     def categorize_article_fast(self, title: str, content: str) -> Tuple[str, str, float]:
         """
         Categorización ultra-rápida optimizada para throughput masivo
         Returns: (category, subcategory, confidence)
         """
-        text = f"{title} {content}".lower()
+        text = f"{title} {content}".casefold()
         
         # 1. VERIFICAR PATRONES MUSICALES Y ARTÍSTICOS PRIMERO
         for pattern in self.music_patterns:
-            if re.search(pattern, text, re.IGNORECASE):
+            if pattern.search(text):
                 subcategory = self.identify_subcategory_fast('arte', text)
                 return 'arte', subcategory, 0.90
                 
         for pattern in self.art_patterns:
-            if re.search(pattern, text, re.IGNORECASE):
+            if pattern.search(text):
                 subcategory = self.identify_subcategory_fast('arte', text)
                 return 'arte', subcategory, 0.85
         
         # 2. SCORING RÁPIDO POR CATEGORÍA
         best_category = 'general'
+        best_rank = len(self.categories)
         max_score = 0
         
-        for category, config in self.categories.items():
+        # Categorías calientes primero: fijan pronto un max_score alto y permiten saltar regex
+        for category, config in self.category_order:
             score = 0
             
             # Keywords (más rápido que regex)
@@ -760,15 +932,30 @@ class IntelligentCategorizer:
                     
             # Solo aplicar regex si ya hay score de keywords
             if score > 0:
+                weight = config['weight']
+                rank = config['rank']
+                
+                # Cota superior (todos los patrones acertados): si no puede ganar, evitar las regex
+                bound = (score + config['pattern_bonus']) * weight
+                if bound < max_score or (bound == max_score and rank > best_rank):
+                    continue
+                    
                 for pattern in config['patterns']:
-                    if re.search(pattern, text, re.IGNORECASE):
+                    if pattern.search(text):
                         score += 3
                         
-                score *= config['weight']
+                score *= weight
                 
-                if score > max_score:
+                if score > max_score or (score == max_score and rank < best_rank):
                     max_score = score
                     best_category = category
+                    best_rank = rank
+        
+        # Perfil de aciertos: reordenar cada 1000 artículos
+        self.category_hits[best_category] += 1
+        self.articles_since_reorder += 1
+        if self.articles_since_reorder >= 1000:
+            self.reorder_categories_by_profile()
         
         # 3. CALCULAR CONFIANZA RÁPIDA
         confidence = min(max_score / 20.0, 1.0) if max_score > 0 else 0.3
@@ -784,7 +971,7 @@ class IntelligentCategorizer:
             return 'general'
             
         for subcategory, pattern in self.subcategory_patterns[category].items():
-            if re.search(pattern, text, re.IGNORECASE):
+            if pattern.search(text):
                 return subcategory
                 
         return 'general'
@@ -799,13 +986,17 @@ class IntelligentCategorizer:
         # Obtener plantillas para este tipo
         templates = self.conversation_templates.get(content_type, self.conversation_templates['general'])
         
+        # El tiempo verbal depende solo del artículo: se calcula una vez para todas las preguntas
+        verb_tense = self._determine_verb_tense(title, content, content_type)
+        
         # Generar preguntas básicas (máximo 3 para dejar espacio a la pregunta profunda)
         basic_questions = templates.get('basic', templates if isinstance(templates, list) else [])
         for question_template in basic_questions[:3]:  # Máximo 3 básicas
             question = question_template.format(topic=title)
+            question_type = self.classify_question_type_fast(question)
             
             # Generar respuesta contextual
-            answer = self._generate_contextual_answer(question, title, content, content_type)
+            answer = self._generate_contextual_answer(question, title, content, content_type, verb_tense)
             
             # Calcular métricas de confianza
             confidence = self.confidence_metrics.calculate_confidence(
@@ -813,7 +1004,7 @@ class IntelligentCategorizer:
                 content=content,
                 category=category,
                 subcategory=subcategory,
-                question_type=self.classify_question_type_fast(question)
+                question_type=question_type
             )
             
             conversations.append({
@@ -823,7 +1014,7 @@ class IntelligentCategorizer:
                 'subcategory': subcategory,
                 'content_type': content_type,
                 'confidence_score': confidence.get('global_confidence', 0.8),
-                'conversation_type': self.classify_question_type_fast(question)
+                'conversation_type': question_type
             })
         
         # SIEMPRE generar pregunta de análisis en profundidad
@@ -852,20 +1043,22 @@ class IntelligentCategorizer:
             
         return conversations
         
-    def _generate_contextual_answer(self, question: str, title: str, content: str, content_type: str) -> str:
-        """Genera respuestas contextuales basadas en el tipo de pregunta y contenido"""
+    def _generate_contextual_answer(self, question: str, title: str, content: str, content_type: str,
+                                    verb_tense: dict) -> str:
+        """Genera respuestas contextuales basadas en el tipo de pregunta y contenido
         
-        # Determinar el tiempo verbal apropiado según el tipo de entidad
-        verb_tense = self._determine_verb_tense(title, content, content_type)
+        verb_tense viene de _determine_verb_tense, calculado una vez por artículo.
+        """
         
         # Buscar información específica según el tipo de pregunta
-        if 'cuándo' in question.lower() or 'año' in question.lower():
+        question_lower = question.lower()
+        if 'cuándo' in question_lower or 'año' in question_lower:
             # Buscar fechas y eventos temporales
             dates = re.findall(r'\b(?:en )?(\d{1,2} de \w+ de \d{4}|\d{4}|\w+ de \d{4})\b', content)
             if dates:
                 return f"En relación a {title}, las fechas relevantes son: {', '.join(dates[:3])}"
                 
-        elif 'dónde' in question.lower():
+        elif 'dónde' in question_lower:
             # Buscar ubicaciones geográficas
             locations = re.findall(r'(?:en|de|desde) ([A-Z][a-záéíóúñü][a-záéíóúñü\s]+?)(?:[.,;]|$)', content)
             if locations:
@@ -873,25 +1066,26 @@ class IntelligentCategorizer:
                 if clean_locations:
                     return f"{title} se localiza o tiene relación con: {', '.join(clean_locations)}"
         
-        elif 'quién' in question.lower():
+        elif 'quién' in question_lower:
             # Buscar personas mencionadas
             people = re.findall(r'\b([A-Z][a-záéíóúñü]+ [A-Z][a-záéíóúñü]+)\b', content)
             if people and content_type == 'persona':
                 bio_info = self._extract_biographical_info(content, verb_tense)
                 return f"{title} {bio_info}"
                 
-        elif 'qué' in question.lower():
+        elif 'qué' in question_lower:
             # Definiciones y descripciones con tiempo verbal apropiado
             first_sentence = self._extract_definition_sentence(content, title, verb_tense)
             if first_sentence:
                 return first_sentence
         
-        # Respuesta contextual genérica pero informativa
-        sentences = content.split('.')[:3]
+        # Respuesta contextual genérica pero informativa (maxsplit: no partir el resto del contenido)
+        sentences = content.split('.', 3)[:3]
+        title_lower = title.lower()
         relevant_sentence = ""
         for sentence in sentences:
             sentence = sentence.strip()
-            if 50 < len(sentence) < 300 and title.lower() in sentence.lower():
+            if 50 < len(sentence) < 300 and title_lower in sentence.lower():
                 relevant_sentence = sentence
                 break
         
@@ -938,67 +1132,19 @@ class IntelligentCategorizer:
     
     def _is_person_deceased(self, content: str) -> bool:
         """Detecta si una persona ha fallecido"""
-        deceased_patterns = [
-            r'\b(?:murió|falleció|fallecido|muerto|†)\b',
-            r'\b\d{4}\s*[-–]\s*\d{4}\b',  # Años de nacimiento-muerte
-            r'\b(?:difunto|finado|extinto)\b',
-            r'\b(?:fue enterrado|fue sepultado)\b',
-            r'\b(?:su muerte|su fallecimiento)\b'
-        ]
-        
-        for pattern in deceased_patterns:
-            if re.search(pattern, content, re.IGNORECASE):
-                return True
-        
-        return False
+        return DECEASED_PATTERN.search(content) is not None
     
     def _is_organization(self, content: str) -> bool:
         """Detecta si el artículo es sobre una organización"""
-        org_patterns = [
-            r'\b(?:empresa|corporación|compañía|organización)\b',
-            r'\b(?:fundada|creada|establecida) en\b',
-            r'\b(?:club|equipo|banda|grupo)\b',
-            r'\b(?:partido|movimiento|asociación)\b',
-            r'\b(?:gobierno|ministerio|departamento)\b'
-        ]
-        
-        for pattern in org_patterns:
-            if re.search(pattern, content, re.IGNORECASE):
-                return True
-        
-        return False
+        return ORGANIZATION_PATTERN.search(content) is not None
     
     def _is_organization_defunct(self, content: str) -> bool:
         """Detecta si una organización ya no existe"""
-        defunct_patterns = [
-            r'\b(?:desaparecida|extinta|disuelta|cerrada)\b',
-            r'\b(?:fue disuelta|fue cerrada|cesó sus operaciones)\b',
-            r'\b(?:hasta \d{4}|terminó en \d{4})\b',
-            r'\b(?:ya no existe|no existe más)\b',
-            r'\b(?:ex-|antigua|former)\b',
-            r'\b\d{4}\s*[-–]\s*\d{4}\b',  # Años de inicio-fin
-            r'\b(?:quebró|en bancarrota|liquidada)\b'
-        ]
-        
-        for pattern in defunct_patterns:
-            if re.search(pattern, content, re.IGNORECASE):
-                return True
-        
-        return False
+        return DEFUNCT_ORGANIZATION_PATTERN.search(content) is not None
     
     def _is_historical_event(self, content: str) -> bool:
         """Detecta si es un evento histórico"""
-        historical_patterns = [
-            r'\b(?:guerra|batalla|revolución|conflicto)\b',
-            r'\b(?:siglo|año|época|era)\b.*\b(?:XVIII|XIX|XX|XXI|\d{4})\b',
-            r'\b(?:acontecimiento|evento|suceso) (?:histórico|importante)\b'
-        ]
-        
-        for pattern in historical_patterns:
-            if re.search(pattern, content, re.IGNORECASE):
-                return True
-        
-        return False
+        return HISTORICAL_EVENT_PATTERN.search(content) is not None
     
     def _generate_deep_analysis(self, title: str, content: str, content_type: str) -> str:
         """Genera análisis en profundidad basado en el tipo de contenido"""
@@ -1091,22 +1237,23 @@ class IntelligentCategorizer:
     def _analyze_person(self, title: str, paragraphs: List[str]) -> str:
         """Análisis profundo de personas"""
         analysis_parts = []
+        lowered = [p.lower() for p in paragraphs]  # Una sola conversión por párrafo para las tres búsquedas
         
         # Información biográfica
-        for p in paragraphs[:2]:
-            if any(keyword in p.lower() for keyword in ['nació', 'nacido', 'nacida', 'vida', 'biografía']):
+        for p, p_lower in zip(paragraphs[:2], lowered):
+            if any(keyword in p_lower for keyword in ('nació', 'nacido', 'nacida', 'vida', 'biografía')):
                 analysis_parts.append(f"Biografía: {p}")
                 break
         
         # Logros y obra
-        for p in paragraphs:
-            if any(keyword in p.lower() for keyword in ['obra', 'trabajo', 'carrera', 'logro', 'contribución']):
+        for p, p_lower in zip(paragraphs, lowered):
+            if any(keyword in p_lower for keyword in ('obra', 'trabajo', 'carrera', 'logro', 'contribución')):
                 analysis_parts.append(f"Contribuciones: {p}")
                 break
         
         # Legado
-        for p in paragraphs:
-            if any(keyword in p.lower() for keyword in ['legado', 'influencia', 'importancia', 'reconocimiento']):
+        for p, p_lower in zip(paragraphs, lowered):
+            if any(keyword in p_lower for keyword in ('legado', 'influencia', 'importancia', 'reconocimiento')):
                 analysis_parts.append(f"Legado: {p}")
                 break
         
@@ -1137,16 +1284,18 @@ class IntelligentCategorizer:
     
     def _extract_definition_sentence(self, content: str, title: str, verb_tense: dict) -> str:
         """Extrae la oración de definición principal con tiempo verbal apropiado"""
-        sentences = content.split('.')
-        for sentence in sentences[:5]:
+        sentences = content.split('.', 5)[:5]  # Solo las 5 primeras: sin partir el resto del contenido
+        title_lower = title.lower()
+        for sentence in sentences:
             sentence = sentence.strip()
-            if (title.lower() in sentence.lower() and 
-                any(verb in sentence.lower() for verb in ['es', 'fue', 'son', 'era', 'constituye']) and
+            sentence_lower = sentence.lower()
+            if (title_lower in sentence_lower and 
+                any(verb in sentence_lower for verb in ('es', 'fue', 'son', 'era', 'constituye')) and
                 50 < len(sentence) < 400):
                 # Ajustar tiempo verbal en la oración encontrada
-                if 'fue' in sentence.lower() and verb_tense['ser'] == 'es':
+                if 'fue' in sentence_lower and verb_tense['ser'] == 'es':
                     sentence = re.sub(r'\bfue\b', 'es', sentence, flags=re.IGNORECASE)
-                elif 'es' in sentence.lower() and verb_tense['ser'] == 'fue':
+                elif 'es' in sentence_lower and verb_tense['ser'] == 'fue':
                     sentence = re.sub(r'\bes\b', 'fue', sentence, flags=re.IGNORECASE)
                 return sentence
         return ""
@@ -1240,7 +1389,7 @@ class CategoryManager:
             'total_categories_found': len(self.category_counts),
             'final_categories_count': len(self.final_categories),
             'total_articles': self.total_articles,
-            'most_popular': dict(sorted(self.category_counts.items(), key=lambda x: x[1], reverse=True)[:10]),
+            'most_popular': dict(heapq.nlargest(10, self.category_counts.items(), key=itemgetter(1))),
             'final_categories': list(self.final_categories.keys()),
             'generic_categories': self.generic_categories
         }
@@ -1263,8 +1412,9 @@ class ContentManager:
     def __init__(self, use_category_manager: bool = True):
         self.categorizer = IntelligentCategorizer()
         self.category_manager = CategoryManager() if use_category_manager else None
-        self.title_inference = TitleInferenceEngine()
-        self.confidence_metrics = ConfidenceMetrics()
+        # Reutilizar los motores ya construidos por el categorizador (evita construirlos dos veces)
+        self.title_inference = self.categorizer.title_inference
+        self.confidence_metrics = self.categorizer.confidence_metrics
         # Acceder a las plantillas desde el categorizador
         self.conversation_templates = self.categorizer.conversation_templates
         self.stats = {
@@ -1280,10 +1430,13 @@ class ContentManager:
         Procesa un artículo completo de forma ultra-rápida
         Returns: Dict con categoría, subcategoría, conversaciones
         """
+        # Descartes baratos primero: sin título no se toca el contenido
         title = article.get('title', '').strip()
-        content = article.get('content', '').strip()
+        if not title:
+            return None
         
-        if not title or not content or len(content) < 50:
+        content = article.get('content', '').strip()
+        if len(content) < 50:
             return None
             
         try:
@@ -1523,13 +1676,14 @@ class ContentManager:
         
         # Escribir conversaciones en archivos JSONL
         conversations_per_file = 50000
+        generation_date = datetime.now().isoformat()  # Mismo sello para toda la generación
         file_counter = 0
         
         for i in range(0, len(consciencia_conversations), conversations_per_file):
             file_counter += 1
             output_file = consciencia_dir / f"consciencia_{file_counter:04d}.jsonl"
             
-            with open(output_file, 'w', encoding='utf-8') as f:
+            with open(output_file, 'wb', buffering=1 << 20) as f:
                 batch = consciencia_conversations[i:i + conversations_per_file]
                 for conv in batch:
                     # Formato de conversación estándar
@@ -1543,11 +1697,12 @@ class ContentManager:
                             'category': 'consciencia',
                             'subcategory': conv['subcategory'],
                             'conversation_type': conv['conversation_type'],
-                            'generation_date': datetime.now().isoformat(),
+                            'generation_date': generation_date,
                             'categories_available': categories_found[:20]  # Primeras 20 categorías
                         }
                     }
-                    f.write(json.dumps(conversation_record, ensure_ascii=False) + '\n')
+                    f.write(dumps_compact(conversation_record))
+                    f.write(b'\n')
         
         # Crear metadata
         metadata_file = consciencia_dir / "metadata_consciencia.json"
@@ -1558,13 +1713,13 @@ class ContentManager:
             'categories_found': categories_found,
             'total_articles_processed': total_articles,
             'description': 'Conversaciones sobre el conocimiento disponible, reconocimiento de Wikipedia, categorización y capacidades del sistema',
-            'generation_date': datetime.now().isoformat(),
+            'generation_date': generation_date,
             'conversation_types': ['wikipedia_recognition', 'categorization_explanation', 'category_explanation', 'system_capabilities'],
             'note': 'Categoría consciencia: Conocimiento sobre el sistema y sus fuentes'
         }
         
-        with open(metadata_file, 'w', encoding='utf-8') as f:
-            json.dump(metadata, f, ensure_ascii=False, indent=2)
+        # json.dump escribe cada fragmento por separado: serializar primero y escribir una vez
+        metadata_file.write_text(json.dumps(metadata, ensure_ascii=False, indent=2), encoding='utf-8')
         
         return {
             'total_conversations': len(consciencia_conversations),
@@ -1575,100 +1730,17 @@ class ContentManager:
     
     def _get_category_explanation(self, category: str) -> dict:
         """Proporciona explicaciones detalladas para cada categoría"""
-        explanations = {
-            'arte': {
-                'description': 'Creaciones y expresiones culturales humanas',
-                'scope': 'Música, pintura, literatura, teatro, danza, escultura, arquitectura, cine y todas las formas de expresión artística',
-                'content_types': 'Biografías de artistas, obras específicas, movimientos artísticos, técnicas, historia del arte',
-                'importance': 'representa la creatividad y expresión cultural de la humanidad a lo largo de la historia',
-                'examples': 'pintores famosos, álbumes musicales, obras literarias, películas, esculturas, movimientos artísticos'
-            },
-            'geografia': {
-                'description': 'Estudio de lugares, territorios y características terrestres',
-                'scope': 'Países, ciudades, regiones, características físicas, demografía, clima, recursos naturales',
-                'content_types': 'Información sobre lugares, datos demográficos, características geográficas, recursos naturales',
-                'importance': 'nos ayuda a entender nuestro mundo, ubicaciones, culturas y características territoriales',
-                'examples': 'países, ciudades, montañas, ríos, regiones, capitales, fronteras'
-            },
-            'historia': {
-                'description': 'Registro y análisis de eventos y personalidades del pasado',
-                'scope': 'Biografías, eventos históricos, períodos, civilizaciones, guerras, revoluciones',
-                'content_types': 'Biografías de personajes históricos, descripciones de eventos, análisis de períodos',
-                'importance': 'preserva la memoria humana y nos ayuda a entender el presente a través del pasado',
-                'examples': 'personajes históricos, guerras, revoluciones, imperios, descubrimientos, fechas importantes'
-            },
-            'ciencias': {
-                'description': 'Conocimiento sistemático sobre el mundo natural y técnico',
-                'scope': 'Física, química, matemáticas, investigación, teorías, descubrimientos científicos',
-                'content_types': 'Teorías científicas, biografías de científicos, experimentos, descubrimientos',
-                'importance': 'expande nuestro entendimiento del universo y permite el progreso tecnológico',
-                'examples': 'teorías científicas, científicos famosos, experimentos, descubrimientos, leyes naturales'
-            },
-            'biologia': {
-                'description': 'Estudio de los seres vivos y sus procesos',
-                'scope': 'Especies animales y vegetales, ecosistemas, evolución, genética, anatomía',
-                'content_types': 'Descripciones de especies, información sobre ecosistemas, procesos biológicos',
-                'importance': 'nos ayuda a entender la vida en todas sus formas y nuestra relación con otros seres vivos',
-                'examples': 'especies animales, plantas, ecosistemas, procesos evolutivos, características biológicas'
-            },
-            'tecnologia': {
-                'description': 'Herramientas, sistemas y procesos técnicos',
-                'scope': 'Computación, internet, software, hardware, innovaciones tecnológicas',
-                'content_types': 'Información sobre tecnologías, empresas tecnológicas, innovaciones',
-                'importance': 'transforma la manera en que vivimos, trabajamos y nos comunicamos',
-                'examples': 'computadoras, software, internet, aplicaciones, empresas tecnológicas'
-            },
-            'deportes': {
-                'description': 'Actividades físicas competitivas y recreativas',
-                'scope': 'Diferentes disciplinas deportivas, equipos, competiciones, atletas',
-                'content_types': 'Información sobre deportes, equipos, atletas, competiciones, reglas',
-                'importance': 'promueve la salud, la competencia sana y la unión social a través del deporte',
-                'examples': 'fútbol, basketball, olimpiadas, equipos deportivos, atletas famosos'
-            },
-            'politica': {
-                'description': 'Organización del poder y gobierno en las sociedades',
-                'scope': 'Gobiernos, políticos, partidos, sistemas políticos, elecciones',
-                'content_types': 'Biografías de políticos, información sobre gobiernos, sistemas políticos',
-                'importance': 'define cómo se organizan las sociedades y se toman decisiones colectivas',
-                'examples': 'presidentes, gobiernos, partidos políticos, elecciones, sistemas de gobierno'
-            },
-            'medicina': {
-                'description': 'Ciencia y práctica de la salud humana',
-                'scope': 'Enfermedades, tratamientos, anatomía, medicina preventiva, investigación médica',
-                'content_types': 'Información sobre enfermedades, tratamientos, procedimientos médicos',
-                'importance': 'preserva y mejora la salud humana, combate enfermedades y extiende la vida',
-                'examples': 'enfermedades, tratamientos, medicamentos, procedimientos médicos, especialidades médicas'
-            },
-            'economia': {
-                'description': 'Sistemas de producción, distribución y consumo',
-                'scope': 'Empresas, mercados, comercio, finanzas, sistemas económicos',
-                'content_types': 'Información sobre empresas, mercados, teorías económicas, sistemas financieros',
-                'importance': 'organiza los recursos y la actividad económica de las sociedades',
-                'examples': 'empresas, mercados, monedas, comercio, sistemas económicos'
-            },
-            'educacion': {
-                'description': 'Procesos de enseñanza y aprendizaje',
-                'scope': 'Instituciones educativas, métodos pedagógicos, sistemas educativos',
-                'content_types': 'Información sobre universidades, escuelas, métodos educativos, pedagogía',
-                'importance': 'transmite conocimiento y habilidades para el desarrollo personal y social',
-                'examples': 'universidades, escuelas, métodos de enseñanza, sistemas educativos'
-            },
-            'general': {
-                'description': 'Conocimiento diverso que no se limita a categorías específicas',
-                'scope': 'Temas variados, conceptos multidisciplinarios, información general',
-                'content_types': 'Información diversa, conceptos generales, temas multidisciplinarios',
-                'importance': 'abarca conocimiento que conecta diferentes áreas y proporciona contexto general',
-                'examples': 'conceptos generales, temas multidisciplinarios, información diversa'
-            }
-        }
+        explanation = CATEGORY_EXPLANATIONS.get(category)
+        if explanation is not None:
+            return explanation
         
-        return explanations.get(category, {
+        return {
             'description': f'Área especializada del conocimiento: {category}',
             'scope': f'Temas relacionados con {category} y sus subdisciplinas',
             'content_types': f'Información especializada sobre {category}',
             'importance': f'contribuye al conocimiento humano en el área de {category}',
             'examples': f'temas específicos de {category}'
-        })
+        }
     
     def get_stats(self) -> Dict:
         """Estadísticas del procesador"""
@@ -1676,3 +1748,4 @@ class ContentManager:
         if self.category_manager:
             stats['category_stats'] = self.category_manager.get_category_stats()
         return stats
+
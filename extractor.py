@@ -2,7 +2,7 @@
 """
 🚀 ADAPTIVE WIKI EXTRACTOR - Ultra-optimizado con inteligencia adaptativa
 =========================================================================
-Combina SAX parser confiable con optimizaciones masivas de rendimiento
+Combina parsers XML en C (lxml/expat) con optimizaciones masivas de rendimiento
 y configuración adaptativa según el tamaño del dataset.
 
 CARACTERÍSTICAS:
@@ -14,27 +14,38 @@ CARACTERÍSTICAS:
 - Recuperación automática ante errores
 """
 
-import xml.sax
+from xml.parsers import expat
+import bz2
+import gzip
 import re
 import time
 import os
 import gc
-import psutil
 import hashlib
 import sys
 import argparse
-import json
 import threading
 import queue
 import mmap
+import multiprocessing
+import shutil
+import subprocess
+import traceback
 import io
 from datetime import datetime
 from pathlib import Path
-from typing import List, Set, Dict, Optional, Tuple, Iterator
-from collections import defaultdict, Counter
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import List, Set, Dict, Optional, Tuple, Iterator, BinaryIO
+from contextlib import contextmanager
+from collections import defaultdict, Counter, deque
+from itertools import zip_longest
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
 import signal
 
+try:
+    from lxml import etree  # iterparse en C (libxml2): sin callbacks Python por fragmento de texto
+except ImportError:
+    etree = None
+
 # Patrones precompilados una sola vez (optimización crítica)
 PRECOMPILED_PATTERNS = {
     'cleanup': re.compile(r'\{\{[^}]*\}\}|<ref[^>]*>.*?</ref>|<[^>]*>', re.DOTALL),
@@ -44,16 +55,102 @@ PRECOMPILED_PATTERNS = {
 }
 
 # Importar configuraciones dinámicas por hardware
-from hardware_configs import get_hardware_config, print_hardware_info, optimize_for_queue_issues, diagnose_dataset_configuration
+from json_utils import dumps_compact
+from hardware_configs import get_hardware_config, get_available_cpus, print_hardware_info, optimize_for_queue_issues, diagnose_dataset_configuration
+
+# Tabla de borrado para contar letras españolas con str.translate (sin lista de findall).
+# Equivale a PRECOMPILED_PATTERNS['spanish'] con IGNORECASE, incluidas sus equivalencias Unicode (İ ı ſ K)
+_SPANISH_LETTERS = 'abcdefghijklmnopqrstuvwxyzáéíóúñüç'
+_SPANISH_DELETE_TABLE = str.maketrans('', '', _SPANISH_LETTERS + _SPANISH_LETTERS.upper() + '\u0130\u0131\u017f\u212a')
+
+def clean_wikitext(text: str) -> str:
+    """Quita plantillas, refs y tags, deja solo el texto visible de los enlaces y normaliza espacios
+    
+    'cleanup' va antes que 'links': el texto de un enlace puede contener refs o plantillas con '['
+    (p.ej. pies de imagen con <ref>[http://...]</ref>) que impedirían reconocer el enlace.
+    """
+    cleaned = PRECOMPILED_PATTERNS['cleanup'].sub('', text)
+    cleaned = PRECOMPILED_PATTERNS['links'].sub(r'\2', cleaned)
+    return ' '.join(cleaned.split())  # split/join en C en lugar de la regex de espacios
+
+def _process_article_batch(batch: List[Tuple[str, str]], worker_id: int) -> List[Dict]:
+    """Limpieza, filtro de idioma y fingerprint de un batch (se ejecuta en un proceso del pool)"""
+    processed_articles = []
+    
+    for title, text in batch:
+        try:
+            cleaned = clean_wikitext(text)
+            
+            if len(cleaned) < 100:
+                continue
+            
+            # Verificación de idioma ultra-rápida
+            sample = cleaned[:400]
+            spanish_count = len(sample) - len(sample.translate(_SPANISH_DELETE_TABLE))
+            if spanish_count / len(sample) < 0.25:
+                continue
+            
+            # Crear artículo optimizado
+            article = {
+                'title': title.strip(),
+                'content': cleaned,
+                'length': len(cleaned),
+                'worker_id': worker_id,
+                'hash': hashlib.blake2b((title + cleaned[:30]).encode(), digest_size=4).hexdigest()
+            }
+            
+            processed_articles.append(article)
+        
+        except Exception:
+            continue  # Skip artículos problemáticos sin logging
+    
+    return processed_articles
+
+def _pin_worker_process(worker_cpus: List[int], next_slot) -> None:
+    """Initializer del pool CPU: fija el proceso a su core antes de procesar ningún batch"""
+    with next_slot.get_lock():
+        slot = next_slot.value
+        next_slot.value += 1
+    
+    try:
+        os.sched_setaffinity(0, {worker_cpus[slot % len(worker_cpus)]})
+    except (AttributeError, OSError):
+        pass  # Sin afinidad el proceso sigue en cualquier core permitido
+
+def drain_until(predicate, timeout: float, max_zero_polls: int = 64, max_burst: float = 0.05,
+                backoff: float = 0.5) -> bool:
+    """Espera a que predicate() se cumpla: ráfaga de sondeos inmediatos y luego sondeo espaciado
+    
+    La ráfaga (hasta max_zero_polls o max_burst segundos) resuelve sin latencia el caso común de
+    un apagado ya terminado; después se sondea cada backoff segundos hasta agotar timeout.
+    """
+    start = time.monotonic()
+    deadline = start + timeout
+    burst_end = start + max_burst
+    
+    for _ in range(max_zero_polls):
+        if predicate():
+            return True
+        if time.monotonic() >= burst_end:
+            break
+        time.sleep(0)  # Ceder el GIL a los threads que están saliendo
+    
+    while True:
+        if predicate():
+            return True
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return False
+        time.sleep(min(backoff, remaining))
 
 class AdaptiveExtractorLogger:
     """Logger adaptativo con timestamps inteligentes"""
     
     def __init__(self, log_file: str = "extraction.log"):
         self.log_file = log_file
-        self.start_time = time.time()
+        self.start_time = time.monotonic()
         self.log_interval = 60  # 1 minuto
-        self.last_log_time = time.time()
+        self.last_log_time = time.monotonic()
         
         # Limpiar log anterior
         if Path(self.log_file).exists():
@@ -61,7 +158,7 @@ class AdaptiveExtractorLogger:
     
     def log(self, message: str, force: bool = False):
         """Log con timestamp si ha pasado el intervalo o es forzado"""
-        current_time = time.time()
+        current_time = time.monotonic()
         
         if force or (current_time - self.last_log_time) >= self.log_interval:
             timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
@@ -78,15 +175,6 @@ class AdaptiveExtractorLogger:
             
             if not force:
                 self.last_log_time = current_time
-PRECOMPILED_PATTERNS = {
-    'cleanup': re.compile(r'\{\{[^}]*\}\}|<ref[^>]*>.*?</ref>|<[^>]*>', re.DOTALL),
-    'links': re.compile(r'\[\[([^|\]]*\|)?([^\]]*)\]\]'),
-    'whitespace': re.compile(r'\s+'),
-    'spanish': re.compile(r'[a-záéíóúñüç]', re.IGNORECASE)
-}
-
-# Importar configuraciones dinámicas por hardware
-from hardware_configs import get_hardware_config, print_hardware_info, optimize_for_queue_issues, diagnose_dataset_configuration
 
 class AdaptiveExtractorConfig:
     """Configuración adaptativa inteligente para el extractor"""
@@ -109,10 +197,17 @@ class AdaptiveExtractorConfig:
         self.logger.log(f"   👥 Workers totales: {self.optimal_workers}", force=True)
         self.logger.log(f"   📦 Batch size: {self.optimal_batch_size:,}", force=True)
         self.logger.log(f"   🗂️ Queue size: {self.optimal_queue_size:,}", force=True)
+        self.logger.log(f"   ⏱️ Finalización máxima: {self.max_finalization_time}s", force=True)
+    
+    @classmethod
+    def from_xml_file(cls, xml_path: str) -> 'AdaptiveExtractorConfig':
+        """Crea la configuración especializada para el tamaño de un dump concreto"""
+        return cls(xml_path)
         
     def _estimate_optimal_config(self):
         """Estima configuración óptima según el tamaño del archivo"""
         base_workers = self.hardware_config['MAX_WORKERS']
+        self.target_speed = self.hardware_config['TARGET_SPEED']
         
         # Configuración adaptativa según tamaño del archivo
         if self.file_size_gb > 15.0:  # Archivos muy grandes (como el nuestro de 19.8GB)
@@ -121,6 +216,7 @@ class AdaptiveExtractorConfig:
             self.optimal_queue_size = self.hardware_config['QUEUE_SIZE'] * 2  # Colas más grandes
             self.optimal_timeout = 0.1  # Timeout más agresivo
             self.optimal_flush_threshold = 100000  # Flush más frecuente
+            self.optimal_finalization_factor = 4  # Colas grandes: más backlog que drenar
             self.logger.log(f"   🎯 Configuración para archivo MUY GRANDE detectada", force=True)
             
         elif self.file_size_gb > 5.0:  # Archivos grandes
@@ -129,6 +225,7 @@ class AdaptiveExtractorConfig:
             self.optimal_queue_size = int(self.hardware_config['QUEUE_SIZE'] * 1.5)
             self.optimal_timeout = 0.2
             self.optimal_flush_threshold = 150000
+            self.optimal_finalization_factor = 2
             self.logger.log(f"   🎯 Configuración para archivo GRANDE detectada", force=True)
             
         elif self.file_size_gb > 1.0:  # Archivos medianos
@@ -137,6 +234,7 @@ class AdaptiveExtractorConfig:
             self.optimal_queue_size = self.hardware_config['QUEUE_SIZE']
             self.optimal_timeout = 0.5
             self.optimal_flush_threshold = 200000
+            self.optimal_finalization_factor = 1
             self.logger.log(f"   🎯 Configuración para archivo MEDIANO detectada", force=True)
             
         else:  # Archivos pequeños
@@ -145,6 +243,7 @@ class AdaptiveExtractorConfig:
             self.optimal_queue_size = self.hardware_config['QUEUE_SIZE'] // 2
             self.optimal_timeout = 1.0
             self.optimal_flush_threshold = 300000
+            self.optimal_finalization_factor = 1
             self.logger.log(f"   🎯 Configuración para archivo PEQUEÑO detectada", force=True)
         
         # Aplicar optimizaciones específicas para colas si es necesario
@@ -157,10 +256,36 @@ class AdaptiveExtractorConfig:
             self.optimal_timeout = min(optimized_config.get('QUEUE_TIMEOUT', 1.0), self.optimal_timeout)
             
             self.logger.log(f"   ⚡ Optimizaciones de cola aplicadas para {estimated_articles:,} artículos", force=True)
+        
+        # Límites de finalización especializados por tamaño (el drenado real lo señala un Event)
+        self.max_finalization_time = self.hardware_config['MAX_FINALIZATION_TIME'] * self.optimal_finalization_factor
+        self.force_exit_timeout = self.hardware_config['FORCE_EXIT_TIMEOUT']
 
 # Configuración adaptativa según hardware detectado
 ADAPTIVE_CONFIG = None  # Se inicializará en main()
 
+# Plantilla del bloque de progreso (se formatea de una vez con format_map)
+PROGRESS_TEMPLATE = (
+    "🚀 ULTRA-FAST PROGRESS:\n"
+    "   📖 Páginas: {pages:,} ({rate:.0f} p/s)\n"
+    "   📦 Batches enviados: {batches:,}\n"
+    "   📚 Artículos procesados: {articles:,}\n"
+    "   🗂️ Colas: Raw({raw}), Proc({proc}), Out({out})\n"
+    "   ⏱️ Tiempo: {minutes:.1f}min\n"
+)
+
+# Plantilla del resumen de finalización
+SUMMARY_TEMPLATE = (
+    "📊 RESUMEN FINAL:\n"
+    "   📖 Páginas XML: {pages:,}\n"
+    "   📦 Batches enviados: {batches:,}\n"
+    "   📚 Artículos procesados: {articles:,}\n"
+    "   💾 Archivos escritos: {files:,}\n"
+)
+
+# Contadores de progreso que cada worker lleva en su propio slot
+WORKER_COUNTER_KEYS = ('batches_sent', 'batches_processed', 'articles_processed', 'batches_written')
+
 class AdaptiveUltraProcessor:
     """Procesador ultra-optimizado con configuración adaptativa e inteligencia mejorada"""
     
@@ -184,6 +309,18 @@ class AdaptiveUltraProcessor:
         self.processing_pool = ThreadPoolExecutor(max_workers=processing_workers, thread_name_prefix="process")
         self.output_pool = ThreadPoolExecutor(max_workers=output_workers, thread_name_prefix="output")
         
+        # Procesos para el trabajo CPU (regex): los threads de procesamiento solo despachan batches
+        # CPUs permitidas antes de fijar el parser: máscara completa para hijos como el descompresor
+        self.allowed_cpus = get_available_cpus()
+        self.cpu_workers = max(1, min(processing_workers, len(self.allowed_cpus)))
+        self.worker_cpus = self._plan_cpu_affinity()
+        if self.worker_cpus:
+            # Afinidad en el initializer: cada proceso queda fijado antes de tocar memoria (first-touch NUMA)
+            self.cpu_pool = ProcessPoolExecutor(max_workers=self.cpu_workers, initializer=_pin_worker_process,
+                                                initargs=(self.worker_cpus, multiprocessing.Value('i', 0)))
+        else:
+            self.cpu_pool = ProcessPoolExecutor(max_workers=self.cpu_workers)
+        
         # Colas de trabajo con tamaño adaptativo
         self.raw_batch_queue = queue.Queue(maxsize=self.queue_size)
         self.processed_queue = queue.Queue(maxsize=self.queue_size)
@@ -192,14 +329,18 @@ class AdaptiveUltraProcessor:
         # Estado y estadísticas mejoradas
         self.running = True
         self.stats = {
-            'batches_sent': 0,
-            'batches_processed': 0,
-            'articles_processed': 0,
-            'batches_written': 0,
-            'start_time': time.time(),
-            'last_stats_time': time.time()
+            'start_time': time.monotonic(),
+            'last_stats_time': time.monotonic()
         }
         
+        # Contadores por worker: cada thread incrementa solo su slot, get_stats() agrega al leer
+        self.worker_counters = {}
+        
+        # Barrera de finalización: workers vivos por etapa y evento de pipeline drenado
+        self.active_workers = {'extract': 0, 'process': 0, 'output': 0}
+        self.workers_lock = threading.Lock()
+        self.drained = threading.Event()
+        
         # Output management mejorado
         self.output_dir = Path(output_dir)
         self.output_dir.mkdir(exist_ok=True)
@@ -218,7 +359,7 @@ class AdaptiveUltraProcessor:
     
     def log_progress_intelligent(self, force: bool = False):
         """Logging inteligente de progreso con intervalos adaptativos"""
-        current_time = time.time()
+        current_time = time.monotonic()
         
         # Logging adaptativo: más frecuente al inicio, menos después
         elapsed = current_time - self.stats['start_time']
@@ -235,10 +376,11 @@ class AdaptiveUltraProcessor:
     
     def _print_detailed_progress(self):
         """Progreso detallado con métricas de rendimiento"""
-        current_time = time.time()
+        current_time = time.monotonic()
         elapsed = current_time - self.stats['start_time']
         
-        articles_rate = self.stats['articles_processed'] / elapsed if elapsed > 0 else 0
+        stats = self.get_stats()
+        articles_rate = stats['articles_processed'] / elapsed if elapsed > 0 else 0
         
         # Estado de colas
         raw_size = self.raw_batch_queue.qsize()
@@ -249,9 +391,9 @@ class AdaptiveUltraProcessor:
         total_queue_usage = (raw_size + proc_size + out_size) / (self.queue_size * 3) * 100
         
         self.logger.log(f"� PROGRESO ADAPTATIVO:", force=True)
-        self.logger.log(f"   📚 Artículos procesados: {self.stats['articles_processed']:,}", force=True)
+        self.logger.log(f"   📚 Artículos procesados: {stats['articles_processed']:,}", force=True)
         self.logger.log(f"   � Velocidad: {articles_rate:.0f} artículos/s", force=True)
-        self.logger.log(f"   📦 Batches: Enviados({self.stats['batches_sent']:,}) Procesados({self.stats['batches_processed']:,}) Escritos({self.stats['batches_written']:,})", force=True)
+        self.logger.log(f"   📦 Batches: Enviados({stats['batches_sent']:,}) Procesados({stats['batches_processed']:,}) Escritos({stats['batches_written']:,})", force=True)
         self.logger.log(f"   �️ Colas: Raw({raw_size}) Proc({proc_size}) Out({out_size}) - Uso: {total_queue_usage:.1f}%", force=True)
         self.logger.log(f"   ⏱️ Tiempo transcurrido: {elapsed/60:.1f}min", force=True)
         
@@ -265,7 +407,14 @@ class AdaptiveUltraProcessor:
         """Inicia todos los pools de workers especializados"""
         print(f"🚀 Iniciando workers especializados...")
         
-        # Workers de extracción (reciben batches del SAX parser)
+        # Arrancar los procesos antes que cualquier thread: fork con un solo thread activo
+        self.cpu_pool.submit(int).result()
+        print(f"⚙️ {self.cpu_workers} procesos de procesamiento activos")
+        
+        workers_per_stage = self.num_workers // 3
+        self.active_workers = dict.fromkeys(self.active_workers, workers_per_stage)
+        
+        # Workers de extracción (reciben batches del parser XML)
         for i in range(self.num_workers // 3):
             self.extraction_pool.submit(self._extraction_worker, i)
         
@@ -278,11 +427,52 @@ class AdaptiveUltraProcessor:
             self.output_pool.submit(self._output_worker, i)
         
         print(f"✅ {self.num_workers} workers especializados activos")
+        
+        # Afinidad después de crear los threads: solo el thread principal (parser) queda fijado
+        self._pin_parser_thread()
+    
+    def _plan_cpu_affinity(self) -> Optional[List[int]]:
+        """Cores para los procesos CPU según AFFINITY_STRATEGY (un core físico por proceso), o None"""
+        strategy = self.config.hardware_config.get('AFFINITY_STRATEGY', 'none')
+        if strategy == 'none':
+            return None
+        
+        try:
+            cpus = self.allowed_cpus
+            if len(cpus) < 2:
+                return None
+            
+            # Fijar solo si hay exactamente un proceso por core físico: con SMT u oversubscription empeora
+            physical_cpus = one_cpu_per_physical_core(cpus)
+            if self.cpu_workers != len(physical_cpus):
+                self.logger.log(f"⏭️ Afinidad omitida: {self.cpu_workers} procesos CPU ≠ {len(physical_cpus)} cores físicos", force=True)
+                return None
+            
+            return order_cpus(physical_cpus, strategy)
+        except OSError as e:
+            self.logger.log(f"⚠️ Afinidad de CPU no aplicada: {e}", force=True)
+            return None
+    
+    def _pin_parser_thread(self):
+        """Fija el parser en un core lógico libre (hermano SMT) fuera de los de los procesos CPU"""
+        if not self.worker_cpus:
+            return
+        
+        try:
+            spare_cpus = sorted(set(self.allowed_cpus) - set(self.worker_cpus))
+            parser_cpu = spare_cpus[-1] if spare_cpus else None
+            if parser_cpu is not None:
+                os.sched_setaffinity(0, {parser_cpu})  # Afecta solo al thread que llama
+            strategy = self.config.hardware_config['AFFINITY_STRATEGY']
+            self.logger.log(f"📌 Afinidad '{strategy}': {len(self.worker_cpus)} cores físicos para procesos CPU, parser en core {parser_cpu}", force=True)
+        except (AttributeError, OSError) as e:
+            self.logger.log(f"⚠️ Afinidad del parser no aplicada: {e}", force=True)
     
     def _extraction_worker(self, worker_id: int):
         """Worker especializado en extracción rápida de datos básicos"""
-        start_time = time.time()
-        while self.running and (time.time() - start_time < 3600):  # Max 1 hora
+        counters = self._worker_counters('extract', worker_id)
+        start_time = time.monotonic()
+        while self.running and (time.monotonic() - start_time < 3600):  # Max 1 hora
             try:
                 raw_batch = self.raw_batch_queue.get(timeout=self.worker_timeout)
                 if raw_batch is None:
@@ -290,19 +480,14 @@ class AdaptiveUltraProcessor:
                     break
                 
                 # Extracción ultra-rápida (solo filtros básicos)
-                extracted = []
-                for title, text in raw_batch:
-                    # Filtros ultra-rápidos sin regex
-                    if (len(text) > 200 and 
-                        ':' not in title and 
-                        'wikipedia:' not in title.lower() and
-                        'plantilla:' not in title.lower()):
-                        extracted.append((title, text))
+                # ':' ya excluye los namespaces (Wikipedia:, Plantilla:...): sin title.lower() por página
+                extracted = [(title, text) for title, text in raw_batch
+                             if len(text) > 200 and ':' not in title]
                 
                 if extracted:
                     try:
                         self.processed_queue.put(extracted, timeout=0.1)
-                        self.stats['batches_sent'] += 1
+                        counters['batches_sent'] += 1
                     except queue.Full:
                         self.logger.log(f"⚠️ Extractor-{worker_id}: Cola procesamiento llena, descartando batch")
                 
@@ -317,58 +502,28 @@ class AdaptiveUltraProcessor:
                 break
         
         print(f"✅ Extractor-{worker_id}: Terminado")
+        self._worker_finished('extract')
     
     def _processing_worker(self, worker_id: int):
         """Worker especializado en procesamiento intensivo con regex"""
-        # Patrones locales para thread-safety
-        patterns = PRECOMPILED_PATTERNS
-        start_time = time.time()
+        counters = self._worker_counters('process', worker_id)
+        start_time = time.monotonic()
         
-        while self.running and (time.time() - start_time < 3600):  # Max 1 hora
+        while self.running and (time.monotonic() - start_time < 3600):  # Max 1 hora
             try:
                 batch = self.processed_queue.get(timeout=self.worker_timeout)
                 if batch is None:
                     self.logger.log(f"🔄 Processor-{worker_id}: Señal de parada")
                     break
                 
-                # Procesamiento intensivo ultra-optimizado
-                processed_articles = []
-                
-                for title, text in batch:
-                    try:
-                        # Limpieza ultra-rápida en un solo paso
-                        cleaned = patterns['cleanup'].sub('', text)
-                        cleaned = patterns['links'].sub(r'\2', cleaned)
-                        cleaned = patterns['whitespace'].sub(' ', cleaned).strip()
-                        
-                        if len(cleaned) < 100:
-                            continue
-                        
-                        # Verificación de idioma ultra-rápida
-                        sample = cleaned[:400]
-                        spanish_count = patterns['spanish'].findall(sample)
-                        if len(spanish_count) / len(sample) < 0.25:
-                            continue
-                        
-                        # Crear artículo optimizado
-                        article = {
-                            'title': title.strip(),
-                            'content': cleaned,
-                            'length': len(cleaned),
-                            'worker_id': worker_id,
-                            'hash': hashlib.sha256(f"{title}{cleaned[:30]}".encode()).hexdigest()[:8]
-                        }
-                        
-                        processed_articles.append(article)
-                        
-                    except Exception:
-                        continue  # Skip artículos problemáticos sin logging
+                # Procesamiento intensivo en un proceso hijo (regex fuera del GIL)
+                processed_articles = self.cpu_pool.submit(_process_article_batch, batch, worker_id).result()
                 
                 if processed_articles:
                     try:
                         self.output_queue.put(processed_articles, timeout=0.1)
-                        self.stats['articles_processed'] += len(processed_articles)
-                        self.stats['batches_processed'] += 1
+                        counters['articles_processed'] += len(processed_articles)
+                        counters['batches_processed'] += 1
                     except queue.Full:
                         print(f"⚠️ Processor-{worker_id}: Cola output llena, descartando {len(processed_articles)} artículos")
                 
@@ -383,15 +538,16 @@ class AdaptiveUltraProcessor:
                 break
         
         print(f"✅ Processor-{worker_id}: Terminado")
+        self._worker_finished('process')
     
     def _output_worker(self, worker_id: int):
         """Worker especializado en escritura ultra-rápida a disco con timeout estricto"""
         write_buffer = []
-        last_flush_time = time.time()
-        start_time = time.time()  # Para timeout absoluto
+        last_flush_time = time.monotonic()
+        start_time = time.monotonic()  # Para timeout absoluto
         MAX_WORKER_TIME = 3600  # 1 hora máximo por worker
         
-        while self.running and (time.time() - start_time < MAX_WORKER_TIME):
+        while self.running and (time.monotonic() - start_time < MAX_WORKER_TIME):
             try:
                 articles = self.output_queue.get(timeout=0.5)  # Timeout más corto
                 if articles is None:
@@ -401,7 +557,7 @@ class AdaptiveUltraProcessor:
                 write_buffer.extend(articles)
                 
                 # Escribir cuando el buffer esté lleno O haya pasado tiempo
-                current_time = time.time()
+                current_time = time.monotonic()
                 should_flush = (len(write_buffer) >= 200000 or  # 200K artículos por archivo (ultra-masivo)
                                (write_buffer and current_time - last_flush_time > 15))  # O cada 15 segundos (más agresivo)
                 
@@ -414,7 +570,7 @@ class AdaptiveUltraProcessor:
                 
             except queue.Empty:
                 # Escribir buffer pendiente en timeout si hay datos
-                current_time = time.time()
+                current_time = time.monotonic()
                 if write_buffer and (current_time - last_flush_time > 10):  # Flush cada 10s en timeout
                     self._write_buffer_ultra_fast(write_buffer, worker_id)
                     write_buffer.clear()
@@ -443,8 +599,49 @@ class AdaptiveUltraProcessor:
             except Exception as e:
                 print(f"❌ Worker-{worker_id}: Error en buffer final: {e}")
         
-        elapsed = time.time() - start_time
+        elapsed = time.monotonic() - start_time
         print(f"✅ Worker-{worker_id}: Terminado después de {elapsed:.1f}s")
+        self._worker_finished('output')
+    
+    def _worker_finished(self, stage: str):
+        """Al salir el último worker de una etapa, propaga la parada a la siguiente"""
+        with self.workers_lock:
+            self.active_workers[stage] -= 1
+            if self.active_workers[stage] > 0:
+                return
+        self._propagate_stop(stage)
+    
+    def _propagate_stop(self, stage: str):
+        """Envía sentinels a la primera etapa posterior con workers vivos; sin ninguna, marca drenado"""
+        next_stages = {'extract': ('process', self.processed_queue), 'process': ('output', self.output_queue)}
+        
+        while stage in next_stages:
+            stage, stage_queue = next_stages[stage]
+            with self.workers_lock:
+                pending_workers = self.active_workers[stage]
+            if pending_workers > 0:
+                self._send_stop_signals(stage_queue, pending_workers)
+                return
+        self.drained.set()
+    
+    def _send_stop_signals(self, stage_queue: queue.Queue, count: int):
+        """Encola un sentinel None por worker, detrás de todos los batches pendientes"""
+        for _ in range(count):
+            while self.running:
+                try:
+                    stage_queue.put(None, timeout=1.0)
+                    break
+                except queue.Full:
+                    continue
+    
+    def signal_end_of_input(self):
+        """Fin del XML: inicia la parada en cascada desde los workers de extracción"""
+        with self.workers_lock:
+            extract_workers = self.active_workers['extract']
+        if extract_workers > 0:
+            self._send_stop_signals(self.raw_batch_queue, extract_workers)
+        else:
+            self._propagate_stop('extract')
     
     def _write_buffer_ultra_fast(self, articles: List[Dict], worker_id: int):
         """Escritura ultra-rápida a disco con buffers grandes LOCKLESS (mejorado con patterns del billion_parameters)"""
@@ -455,14 +652,18 @@ class AdaptiveUltraProcessor:
             
             output_file = self.output_dir / f"articles_hybrid_{worker_id}_{current_file_num:04d}.jsonl"
             
-            # Buffer ultra-masivo de escritura (8MB inspirado en billion_parameters)
-            with open(output_file, 'w', encoding='utf-8', buffering=8*1024*1024) as f:  # 8MB buffer
-                for article in articles:
-                    json.dump(article, f, ensure_ascii=False, separators=(',', ':'))
-                    f.write('\n')
+            # Serializar todo el batch en un bytearray del worker y escribirlo de una vez
+            buffer = bytearray()
+            extend = buffer.extend
+            for article in articles:
+                extend(dumps_compact(article))
+                extend(b'\n')
+            
+            with open(output_file, 'wb') as f:  # Una sola escritura: sin buffer intermedio de 8MB
+                f.write(buffer)
             
-            # Stats atómicos sin lock
-            self.stats['batches_written'] += 1
+            # Stats sin lock: slot propio del worker de salida
+            self._worker_counters('output', worker_id)['batches_written'] += 1
             
             print(f"💾 Worker-{worker_id}: {len(articles):,} artículos → {output_file.name}")
             
@@ -470,17 +671,18 @@ class AdaptiveUltraProcessor:
             print(f"❌ Error escritura lockless: {e}")
     
     def add_batch(self, batch: List[Tuple[str, str]]):
-        """Añade batch al pipeline (thread-safe) con retry agresivo"""
-        for attempt in range(5):  # 5 intentos
+        """Añade batch al pipeline (thread-safe) bloqueando hasta que haya hueco en la cola
+        
+        Devuelve False (batch descartado) si el pipeline se detuvo o ya no queda ningún
+        worker de extracción que lea raw_batch_queue: esperar entonces bloquearía para siempre.
+        """
+        # put bloqueante: el productor despierta cuando un consumidor libera un slot (sin sleep-poll)
+        while self.running and not self.drained.is_set() and self.active_workers['extract'] > 0:
             try:
-                timeout = 0.1 + (attempt * 0.05)  # Timeout incremental
-                self.raw_batch_queue.put(batch, timeout=timeout)
+                self.raw_batch_queue.put(batch, timeout=1.0)
                 return True
             except queue.Full:
-                if attempt == 4:  # Último intento
-                    print(f"⚠️ Cola saturada después de 5 intentos, skipping batch de {len(batch)} páginas")
-                    return False
-                time.sleep(0.01)  # Breve pausa antes del retry
+                continue  # Backpressure real: seguir esperando mientras el pipeline esté activo
         return False
     
     def stop_workers(self):
@@ -525,65 +727,74 @@ class AdaptiveUltraProcessor:
         pools = [
             ("Extraction", self.extraction_pool),
             ("Processing", self.processing_pool), 
-            ("Output", self.output_pool)
+            ("Output", self.output_pool),
+            ("CPU", self.cpu_pool)
         ]
         
         for name, pool in pools:
             try:
-                pool.shutdown(wait=False)  # NO ESPERAR
+                pool.shutdown(wait=False, cancel_futures=True)  # NO ESPERAR
                 print(f"✅ {name} pool → shutdown iniciado")
             except Exception as e:
                 print(f"⚠️ {name} pool error: {e}")
         
         # 4. Verificación rápida de threads con timeout forzado
-        import threading
-        start_wait = time.time()
+        start_wait = time.monotonic()
         
-        while time.time() - start_wait < ULTRA_CONFIG['FORCE_EXIT_TIMEOUT']:
-            active_count = threading.active_count()
-            
-            if active_count <= 10:  # Solo threads del sistema
-                print(f"✅ Workers terminados limpiamente ({active_count} threads)")
-                break
-            
-            time.sleep(0.5)
+        # Solo threads del sistema: ráfaga inmediata y después sondeo cada 0.5s
+        clean_exit = drain_until(lambda: threading.active_count() <= 10, self.config.force_exit_timeout)
         
-        elapsed = time.time() - start_wait
-        if elapsed >= ULTRA_CONFIG['FORCE_EXIT_TIMEOUT']:
-            print(f"🚨 TIMEOUT ALCANZADO - Forzando terminación después de {elapsed:.1f}s")
-            
-            # Matar pools agresivamente
-            for name, pool in pools:
-                try:
-                    pool._threads.clear()  # Forzar limpieza de threads
-                except:
-                    pass
+        elapsed = time.monotonic() - start_wait
+        if clean_exit:
+            print(f"✅ Workers terminados limpiamente ({threading.active_count()} threads)")
+        else:
+            # Los threads que quedan salen solos al ver running=False: join_workers los une
+            print(f"🚨 TIMEOUT ALCANZADO - {threading.active_count()} threads aún activos después de {elapsed:.1f}s")
         
         final_active = threading.active_count()
         print(f"🧵 Threads finales: {final_active}")
         
         # 5. Forzar garbage collection
-        import gc
         gc.collect()
         
         print(f"✅ DETENCIÓN COMPLETADA en {elapsed:.1f}s")
     
+    def join_workers(self):
+        """Une los threads y procesos de los pools sin salida forzada
+        
+        Con running=False cada worker sale en como mucho worker_timeout (o al terminar su batch
+        en curso) y el de salida escribe siempre su buffer final antes de terminar.
+        """
+        for pool in (self.extraction_pool, self.processing_pool, self.output_pool, self.cpu_pool):
+            pool.shutdown(wait=True)
+    
+    def _worker_counters(self, role: str, worker_id: int) -> Dict[str, int]:
+        """Slot de contadores propio de un worker (claves fijas: se puede sumar sin lock)"""
+        return self.worker_counters.setdefault((role, worker_id), dict.fromkeys(WORKER_COUNTER_KEYS, 0))
+    
     def get_stats(self):
-        """Obtiene estadísticas actuales"""
-        return self.stats.copy()
+        """Obtiene estadísticas actuales agregando los contadores de cada worker"""
+        stats = self.stats.copy()
+        stats.update(dict.fromkeys(WORKER_COUNTER_KEYS, 0))
+        for counters in list(self.worker_counters.values()):
+            for key, value in counters.items():
+                stats[key] += value
+        return stats
 
-class UltraFastXMLHandler(xml.sax.ContentHandler):
-    """Handler SAX ultra-optimizado con envío masivo a workers y finalización automática"""
+class UltraFastXMLHandler:
+    """Handler XML ultra-optimizado con envío masivo a workers y finalización automática
+    
+    startElement/endElement/characters son los callbacks de expat para parse_file_expat.
+    """
     
     def __init__(self, processor: AdaptiveUltraProcessor):
-        super().__init__()
         self.processor = processor
         
         # Estado del parser
         self.current_element = ""
         self.current_page = {}
         self.in_page = False
-        self.content_buffer = ""
+        self.content_buffer = []  # Fragmentos de texto: join al cerrar el tag (evita concatenación O(n²))
         
         # Batch management ultra-eficiente
         self.page_batch = []
@@ -592,8 +803,9 @@ class UltraFastXMLHandler(xml.sax.ContentHandler):
         # Contadores y estado
         self.total_pages_seen = 0
         self.total_batches_sent = 0
-        self.start_time = time.time()
-        self.last_page_time = time.time()  # Para detectar finalización
+        self.next_progress_at = 200000
+        self.start_time = time.monotonic()
+        self.last_page_time = time.monotonic()  # Para detectar finalización
         self.xml_finished = False  # Flag de finalización del XML
         
         processor.logger.log(f"📖 ULTRA-FAST XML HANDLER:", force=True)
@@ -606,7 +818,7 @@ class UltraFastXMLHandler(xml.sax.ContentHandler):
             self.in_page = True
             self.current_page = {}
         elif name == 'text':
-            self.content_buffer = ""
+            self.content_buffer.clear()
     
     def endDocument(self):
         """Se llama cuando el XML ha terminado de procesarse"""
@@ -626,21 +838,68 @@ class UltraFastXMLHandler(xml.sax.ContentHandler):
             self.in_page = False
             self.current_page = {}
         elif name in ['title', 'text'] and self.in_page:
-            self.current_page[name] = self.content_buffer
-            self.content_buffer = ""
+            self.current_page[name] = ''.join(self.content_buffer)
+            self.content_buffer.clear()
         self.current_element = ""
     
     def characters(self, content):
         if self.current_element in ['title', 'text']:
-            self.content_buffer += content
+            self.content_buffer.append(content)
+    
+    def parse_file(self, xml_path: str):
+        """Parsing con lxml.iterparse: el tokenizer y el dispatch de tags ocurren en C"""
+        for title, text in iter_pages(xml_path, self.processor.allowed_cpus):
+            self._add_page(title.strip(), text.strip())
+        self.endDocument()
+    
+    def parse_file_parallel(self, xml_path: str, range_size: int = 64 << 20):
+        """Parsing paralelo: rangos de <page> completos parseados con expat en el pool de procesos"""
+        pool = self.processor.cpu_pool
+        max_in_flight = self.processor.cpu_workers * 2  # Ventana acotada: memoria constante
+        pending = deque()
+        
+        for start, end in find_page_ranges(xml_path, range_size):
+            pending.append(pool.submit(_parse_page_range, xml_path, start, end))
+            if len(pending) >= max_in_flight:
+                self._add_pages(*pending.popleft().result())
+        
+        # Resultados en orden de archivo
+        while pending:
+            self._add_pages(*pending.popleft().result())
+        self.endDocument()
+    
+    def _add_pages(self, page_count: int, pages: List[Tuple[str, str]]):
+        """Añade al batch las páginas devueltas por un rango (las filtradas en el hijo solo se cuentan)"""
+        self.total_pages_seen += page_count - len(pages)
+        for title, text in pages:
+            self._add_page(title, text)
+    
+    def parse_file_expat(self, xml_path: str):
+        """Fallback sin lxml para dumps comprimidos: expat en streaming sobre el flujo descomprimido"""
+        parser = expat.ParserCreate()
+        parser.buffer_text = True  # Agrupa character data: muchas menos llamadas a characters()
+        parser.buffer_size = 1 << 20
+        parser.StartElementHandler = self.startElement
+        parser.EndElementHandler = self.endElement
+        parser.CharacterDataHandler = self.characters
+        
+        chunk_size = 4 << 20  # 4MB por llamada a Parse
+        with open_dump(xml_path, self.processor.allowed_cpus) as f:
+            chunk = f.read(chunk_size)
+            while chunk:
+                parser.Parse(chunk, False)
+                chunk = f.read(chunk_size)
+        parser.Parse(b'', True)
+        self.endDocument()
     
     def _process_page(self):
         """Procesa página de forma ultra-eficiente"""
+        self._add_page(self.current_page.get('title', '').strip(),
+                       self.current_page.get('text', '').strip())
+    
+    def _add_page(self, title: str, text: str):
+        """Añade una página al batch actual (común a expat e iterparse)"""
         self.total_pages_seen += 1
-        self.last_page_time = time.time()  # Actualizar tiempo de última página
-        
-        title = self.current_page.get('title', '').strip()
-        text = self.current_page.get('text', '').strip()
         
         # Filtro ultra-rápido sin regex
         if title and text and len(text) > 150:
@@ -650,8 +909,9 @@ class UltraFastXMLHandler(xml.sax.ContentHandler):
         if len(self.page_batch) >= self.batch_size:
             self._send_batch_to_workers()
         
-        # Progreso cada 200K páginas
-        if self.total_pages_seen % 200000 == 0:
+        # Progreso cada 200K páginas (umbral: los rangos paralelos avanzan el contador a saltos)
+        if self.total_pages_seen >= self.next_progress_at:
+            self.next_progress_at += 200000
             self._print_ultra_progress()
     
     def _send_batch_to_workers(self):
@@ -659,30 +919,20 @@ class UltraFastXMLHandler(xml.sax.ContentHandler):
         if not self.page_batch:
             return
         
-        # Envío persistente con retry
-        max_attempts = 10
-        for attempt in range(max_attempts):
-            if self.processor.add_batch(self.page_batch.copy()):
-                self.total_batches_sent += 1
-                self.page_batch.clear()
-                return
-            
-            # Si falla, esperar progresivamente más tiempo
-            wait_time = 0.01 * (2 ** attempt)  # Backoff exponencial
-            time.sleep(min(wait_time, 1.0))  # Máximo 1 segundo
-            
-            # En el intento 5, reducir batch size
-            if attempt == 5 and len(self.page_batch) > 10000:
-                print(f"⚠️ Reduciendo batch size de {len(self.page_batch)} a 10000")
-                self.page_batch = self.page_batch[:10000]
+        # Tiempo de última actividad una vez por batch, no por página (sin reloj en el camino caliente)
+        self.last_page_time = time.monotonic()
         
-        # Si después de todos los intentos no se puede enviar
-        print(f"❌ No se pudo enviar batch después de {max_attempts} intentos, descartando {len(self.page_batch)} páginas")
-        self.page_batch.clear()
+        # add_batch bloquea hasta que la cola acepta el batch; solo falla si el pipeline se detuvo
+        if self.processor.add_batch(self.page_batch):
+            self.total_batches_sent += 1
+        else:
+            print(f"❌ Pipeline detenido, descartando {len(self.page_batch)} páginas")
+        # Sin .copy(): la cola se queda con la lista y el handler empieza una nueva
+        self.page_batch = []
     
     def _print_ultra_progress(self):
         """Progreso ultra-rápido con información de colas"""
-        elapsed = time.time() - self.start_time
+        elapsed = time.monotonic() - self.start_time
         pages_rate = self.total_pages_seen / elapsed if elapsed > 0 else 0
         
         processor_stats = self.processor.get_stats()
@@ -692,19 +942,25 @@ class UltraFastXMLHandler(xml.sax.ContentHandler):
         processed_queue_size = self.processor.processed_queue.qsize()
         output_queue_size = self.processor.output_queue.qsize()
         
-        print(f"🚀 ULTRA-FAST PROGRESS:")
-        print(f"   📖 Páginas: {self.total_pages_seen:,} ({pages_rate:.0f} p/s)")
-        print(f"   📦 Batches enviados: {self.total_batches_sent:,}")
-        print(f"   📚 Artículos procesados: {processor_stats['articles_processed']:,}")
-        print(f"   🗂️ Colas: Raw({raw_queue_size}), Proc({processed_queue_size}), Out({output_queue_size})")
-        print(f"   ⏱️ Tiempo: {elapsed/60:.1f}min")
+        # Bloque completo en una sola escritura a stdout
+        sys.stdout.write(PROGRESS_TEMPLATE.format_map({
+            'pages': self.total_pages_seen,
+            'rate': pages_rate,
+            'batches': self.total_batches_sent,
+            'articles': processor_stats['articles_processed'],
+            'raw': raw_queue_size,
+            'proc': processed_queue_size,
+            'out': output_queue_size,
+            'minutes': elapsed / 60,
+        }))
+        sys.stdout.flush()
         
         # Verificar si alcanzamos el objetivo
-        if pages_rate >= ULTRA_CONFIG['TARGET_SPEED']:
-            print(f"🎯 ✅ OBJETIVO ALCANZADO: {pages_rate:.0f} >= {ULTRA_CONFIG['TARGET_SPEED']:,} p/s")
+        if pages_rate >= self.processor.config.target_speed:
+            print(f"🎯 ✅ OBJETIVO ALCANZADO: {pages_rate:.0f} >= {self.processor.config.target_speed:,} p/s")
         
         # Advertir si las colas están muy llenas
-        max_queue_size = ULTRA_CONFIG['QUEUE_SIZE']
+        max_queue_size = self.processor.queue_size
         if raw_queue_size > max_queue_size * 0.8:
             print(f"⚠️ Cola raw cerca del límite: {raw_queue_size}/{max_queue_size}")
         if output_queue_size > max_queue_size * 0.8:
@@ -718,97 +974,227 @@ class UltraFastXMLHandler(xml.sax.ContentHandler):
         if self.page_batch:
             print(f"📦 Último batch: {len(self.page_batch)} páginas")
             try:
-                self.processor.raw_batch_queue.put(self.page_batch.copy(), timeout=2.0)
+                self.processor.raw_batch_queue.put(self.page_batch, timeout=2.0)
                 print(f"✅ Último batch enviado")
             except:
                 print(f"⚠️ Último batch descartado por timeout")
-            self.page_batch.clear()
+            self.page_batch = []
         
-        # 2. Esperar con timeout muy agresivo
-        max_wait = ULTRA_CONFIG['MAX_FINALIZATION_TIME']
+        # 2. Barrera de finalización: sentinels en cascada por etapas y espera al evento de drenado
+        max_wait = self.processor.config.max_finalization_time
         print(f"⏳ Esperando finalización (máximo {max_wait}s)...")
         
-        start_wait = time.time()
-        last_articles = self.processor.get_stats()['articles_processed']
-        stable_count = 0
-        
-        while time.time() - start_wait < max_wait:
-            time.sleep(1)
-            current_stats = self.processor.get_stats()
-            current_articles = current_stats['articles_processed']
-            
-            # Estado de colas
-            raw_size = self.processor.raw_batch_queue.qsize()
-            proc_size = self.processor.processed_queue.qsize()
-            out_size = self.processor.output_queue.qsize()
-            
-            elapsed_wait = time.time() - start_wait
-            print(f"📊 T+{elapsed_wait:.0f}s: {current_articles:,} artículos | Colas: R({raw_size}) P({proc_size}) O({out_size})")
-            
-            # Verificar estabilidad
-            if current_articles == last_articles:
-                stable_count += 1
-            else:
-                stable_count = 0
-                last_articles = current_articles
-            
-            # Condiciones de finalización más agresivas
-            if raw_size == 0 and proc_size == 0 and out_size == 0 and stable_count >= 2:
-                print(f"✅ Procesamiento completado (colas vacías)")
-                break
-            elif stable_count >= 3:  # Solo 3 segundos de estabilidad
-                print(f"✅ Procesamiento estabilizado")
-                break
+        start_wait = time.monotonic()
+        self.processor.signal_end_of_input()
+        drained = self.processor.drained.wait(timeout=max_wait)
         
         # 3. Finalización forzada
-        elapsed_total = time.time() - start_wait
-        if elapsed_total >= max_wait:
+        elapsed_total = time.monotonic() - start_wait
+        if drained:
+            print(f"✅ Procesamiento completado (pipeline drenado en {elapsed_total:.1f}s)")
+        else:
             print(f"� TIMEOUT DE FINALIZACIÓN ({elapsed_total:.1f}s) - Continuando con terminación")
         
         # Estadísticas finales
         final_stats = self.processor.get_stats()
-        print(f"📊 RESUMEN FINAL:")
-        print(f"   📖 Páginas XML: {self.total_pages_seen:,}")
-        print(f"   📦 Batches enviados: {self.total_batches_sent:,}")
-        print(f"   📚 Artículos procesados: {final_stats['articles_processed']:,}")
-        print(f"   💾 Archivos escritos: {final_stats['batches_written']:,}")
+        sys.stdout.write(SUMMARY_TEMPLATE.format_map({
+            'pages': self.total_pages_seen,
+            'batches': self.total_batches_sent,
+            'articles': final_stats['articles_processed'],
+            'files': final_stats['batches_written'],
+        }))
+        sys.stdout.flush()
         
         # Marcar workers para detención
         self.processor.running = False
         print(f"� Workers marcados para detención")
 
-def setup_system_for_ultra_performance():
-    """Configura el sistema para máximo rendimiento"""
-    print("⚡ CONFIGURANDO SISTEMA PARA ULTRA-RENDIMIENTO...")
+def find_page_ranges(xml_path: str, range_size: int) -> List[Tuple[int, int]]:
+    """Divide el XML en rangos de bytes de ~range_size que empiezan tras un </page> y terminan en otro"""
+    ranges = []
+    with open(xml_path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        # '</page>' literal solo puede ser un tag real: dentro del texto aparece escapado
+        start = mm.find(b'<page>')
+        last = mm.rfind(b'</page>')
+        if start < 0 or last < 0:
+            return ranges
+        
+        last_end = last + len(b'</page>')
+        while start < last_end:
+            end = mm.find(b'</page>', min(start + range_size, last)) + len(b'</page>')
+            ranges.append((start, end))
+            start = end
+    return ranges
+
+def _parse_page_range(xml_path: str, start: int, end: int) -> Tuple[int, List[Tuple[str, str]]]:
+    """Parsea con expat un rango de <page> completos (proceso del pool)
+    
+    Devuelve (páginas vistas, [(título, texto)]) solo con artículos del namespace 0 y texto > 150:
+    el resto se descarta aquí y no viaja al proceso principal.
+    """
+    pages = []
+    page = {}
+    page_count = [0]
+    content_buffer = []
+    current = [None]  # 'title' / 'ns' / 'text' mientras se acumula su contenido
+    
+    def start_element(name, attrs):
+        if name == 'title' or name == 'text' or name == 'ns':
+            current[0] = name
+            content_buffer.clear()
+    
+    def end_element(name):
+        if name == current[0]:
+            page[name] = ''.join(content_buffer).strip()
+            current[0] = None
+        elif name == 'page':
+            page_count[0] += 1
+            title = page.pop('title', '')
+            text = page.pop('text', '')
+            # Mismo filtro que _add_page, más namespace (plantillas, categorías... siempre llevan ':')
+            if page.pop('ns', '0') == '0' and title and len(text) > 150:
+                pages.append((title, text))
+    
+    def characters(content):
+        if current[0] is not None:
+            content_buffer.append(content)
+    
+    parser = expat.ParserCreate()
+    parser.buffer_text = True
+    parser.buffer_size = 1 << 20
+    parser.StartElementHandler = start_element
+    parser.EndElementHandler = end_element
+    parser.CharacterDataHandler = characters
+    
+    chunk_size = 4 << 20
+    with open(xml_path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        # Raíz sintética: el rango solo contiene elementos <page> hermanos
+        parser.Parse(b'<mediawiki>', False)
+        segment_start = position = start
+        while position < end:
+            page_start = mm.find(b'<page>', position, end)
+            if page_start < 0:
+                break
+            page_end = mm.find(b'</page>', page_start, end) + len(b'</page>')
+            
+            # Prefiltro en bytes: <ns> va antes de <revision>, así que el primer match es el tag real.
+            # Las páginas fuera del namespace 0 no se decodifican ni pasan por expat
+            ns_start = mm.find(b'<ns>', page_start, page_end)
+            if ns_start >= 0 and mm[ns_start + 4:ns_start + 6] != b'0<':
+                page_count[0] += 1
+                parser.Parse(mm[segment_start:page_start], False)
+                segment_start = page_end
+            elif page_end - segment_start >= chunk_size:
+                # Tramos contiguos de artículos en bloques de ~4MB
+                parser.Parse(mm[segment_start:page_end], False)
+                segment_start = page_end
+            position = page_end
+        parser.Parse(mm[segment_start:end], False)
+        parser.Parse(b'</mediawiki>', True)
+    
+    return page_count[0], pages
+
+# Descompresores externos por extensión, en orden de preferencia (los paralelos primero)
+DECOMPRESSORS = {
+    '.bz2': ('lbzip2', 'pbzip2', 'bzip2'),
+    '.gz': ('pigz', 'gzip'),
+}
+
+def _spawn_decompressor(command: List[str], cpus: Optional[List[int]]) -> subprocess.Popen:
+    """Lanza el descompresor con la máscara de CPUs dada aunque el thread que llama esté fijado
     
+    El hijo hereda la afinidad del thread que hace el fork (el parser, fijado a un core por
+    _pin_parser_thread): se amplía solo durante el Popen y se restaura después. Sin preexec_fn,
+    que no es seguro con threads vivos.
+    """
+    pinned = None
+    if cpus and hasattr(os, 'sched_setaffinity'):
+        current = os.sched_getaffinity(0)
+        if current != set(cpus):
+            os.sched_setaffinity(0, cpus)
+            pinned = current
     try:
-        # Límites del sistema
-        import resource
-        resource.setrlimit(resource.RLIMIT_NOFILE, (100000, 100000))
-        
-        # Variables de entorno optimizadas
-        os.environ['PYTHONUNBUFFERED'] = '1'
-        os.environ['PYTHONDONTWRITEBYTECODE'] = '1'
-        os.environ['OMP_NUM_THREADS'] = str(ULTRA_CONFIG['MAX_WORKERS'])
-        
-        # Configurar afinidad de CPU
-        process = psutil.Process()
-        available_cpus = list(range(min(ULTRA_CONFIG['MAX_WORKERS'], os.cpu_count())))
-        process.cpu_affinity(available_cpus)
-        
-        # Configurar prioridad alta
+        return subprocess.Popen(command, stdout=subprocess.PIPE, bufsize=8 << 20)
+    finally:
+        if pinned is not None:
+            os.sched_setaffinity(0, pinned)
+
+@contextmanager
+def open_dump(xml_path: str, cpus: Optional[List[int]] = None) -> Iterator[BinaryIO]:
+    """Abre el dump como flujo binario ya descomprimido (bz2/gz transparente)
+    
+    cpus: máscara para el descompresor externo (por defecto hereda la del thread que llama).
+    """
+    suffix = Path(xml_path).suffix
+    decompressor = next(filter(None, map(shutil.which, DECOMPRESSORS.get(suffix, ()))), None)
+    
+    if decompressor:
+        # Lectura y descompresión en un proceso aparte: se solapan con el parseo vía pipe
+        with _spawn_decompressor([decompressor, '-dc', xml_path], cpus) as proc:
+            try:
+                yield proc.stdout
+            finally:
+                if proc.poll() is None:
+                    proc.kill()  # Consumidor cortado antes del final: no esperar al descompresor
+        return
+    
+    if suffix == '.bz2':
+        opener = bz2.open
+    elif suffix == '.gz':
+        opener = gzip.open
+    else:
+        opener = open
+    
+    with opener(xml_path, 'rb') as f:
+        yield f
+
+def iter_pages(xml_path: str, cpus: Optional[List[int]] = None) -> Iterator[Tuple[str, str]]:
+    """Itera (título, texto) de cada <page> del dump con lxml.iterparse (bz2/gz transparente)"""
+    with open_dump(xml_path, cpus) as f:
+        yield from _iter_page_elements(f)
+
+def _iter_page_elements(f) -> Iterator[Tuple[str, str]]:
+    """Parsea en streaming los <page> de un fichero binario ya descomprimido"""
+    # '{*}' acepta cualquier versión del namespace de MediaWiki (export-0.10, 0.11...)
+    for _, elem in etree.iterparse(f, events=('end',), tag='{*}page', huge_tree=True):
+        yield elem.findtext('{*}title') or '', elem.findtext('{*}revision/{*}text') or ''
+        
+        # Liberar el subárbol ya procesado para mantener memoria constante
+        elem.clear()
+        while elem.getprevious() is not None:
+            del elem.getparent()[0]
+
+def _cpu_package_id(cpu: int) -> int:
+    """Socket físico de un core según sysfs (0 si no está disponible)"""
+    try:
+        with open(f'/sys/devices/system/cpu/cpu{cpu}/topology/physical_package_id') as f:
+            return int(f.read())
+    except (OSError, ValueError):
+        return 0
+
+def one_cpu_per_physical_core(cpus: List[int]) -> List[int]:
+    """Primer core lógico de cada core físico (socket, core_id) según sysfs"""
+    physical = {}
+    for cpu in sorted(cpus):
         try:
-            process.nice(-10)  # Prioridad alta
-        except:
-            pass
-        
-        print(f"✅ Sistema configurado:")
-        print(f"   🔄 CPU cores: {len(available_cpus)}")
-        print(f"   📁 File descriptors: 100,000")
-        print(f"   ⚡ Prioridad: Alta")
-        
-    except Exception as e:
-        print(f"⚠️ Configuración parcial: {e}")
+            with open(f'/sys/devices/system/cpu/cpu{cpu}/topology/core_id') as f:
+                core_id = int(f.read())
+        except (OSError, ValueError):
+            core_id = cpu  # Sin topología: cada core lógico cuenta como físico
+        physical.setdefault((_cpu_package_id(cpu), core_id), cpu)
+    return sorted(physical.values())
+
+def order_cpus(cpus: List[int], strategy: str) -> List[int]:
+    """Ordena los cores para asignar workers: 'dense' (ascendente), 'reverse' o 'sparse' (alterna sockets)"""
+    cpus = sorted(cpus)
+    if strategy == 'reverse':  # ARM: llenar desde los cores altos, lejos de los que usa el sistema
+        return cpus[::-1]
+    if strategy == 'sparse':  # NUMA: un core de cada socket por turno
+        packages = defaultdict(list)
+        for cpu in cpus:
+            packages[_cpu_package_id(cpu)].append(cpu)
+        return [cpu for group in zip_longest(*packages.values()) for cpu in group if cpu is not None]
+    return cpus
 
 def main():
     """Función principal con procesamiento adaptativo ultra-optimizado"""
@@ -846,7 +1232,7 @@ def main():
         # Iniciar workers especializados
         processor.start_workers()
         
-        # Crear handler SAX ultra-rápido
+        # Crear handler XML ultra-rápido
         handler = UltraFastXMLHandler(processor)
         
         # Manejo de señales con terminación forzada
@@ -854,31 +1240,39 @@ def main():
             config.logger.log(f"⚠️ Señal {signum} recibida, terminando INMEDIATAMENTE...", force=True)
             processor.running = False
             processor.stop_workers()
+            processor.join_workers()
             
-            # Esperar máximo 5 segundos
-            cleanup_start = time.time()
-            while time.time() - cleanup_start < 5:
-                import threading
-                if threading.active_count() <= 5:
-                    break
-                time.sleep(0.5)
-            
-            config.logger.log(f"🚨 TERMINACIÓN FORZADA POR SEÑAL", force=True)
-            os._exit(1)  # Salida inmediata
+            config.logger.log(f"🚨 TERMINACIÓN POR SEÑAL", force=True)
+            sys.exit(1)
         
         signal.signal(signal.SIGINT, signal_handler)
         signal.signal(signal.SIGTERM, signal_handler)
         
         # Procesar XML con detección automática de finalización
-        start_time = time.time()
+        start_time = time.monotonic()
         config.logger.log(f"🚀 Iniciando procesamiento adaptativo ultra-optimizado...", force=True)
         
         try:
-            # SAX parsing (confiable) + workers ultra-optimizados
-            xml.sax.parse(str(xml_path), handler)
-            config.logger.log(f"✅ SAX Parser completado exitosamente", force=True)
+            if xml_path.suffix in DECOMPRESSORS and etree is not None:
+                # Dump comprimido: lxml iterparse descomprime en streaming
+                parser_name = "lxml iterparse"
+                handler.parse_file(str(xml_path))
+            elif xml_path.suffix in DECOMPRESSORS:
+                # Dump comprimido sin lxml: expat en streaming (los rangos paralelos necesitan XML plano)
+                parser_name = "Expat streaming"
+                handler.parse_file_expat(str(xml_path))
+            else:
+                # XML plano: rangos de páginas parseados con expat en paralelo
+                parser_name = "Expat paralelo"
+                handler.parse_file_parallel(str(xml_path))
+            
+            if handler.total_pages_seen:
+                config.logger.log(f"✅ {parser_name} completado exitosamente", force=True)
         except Exception as e:
-            config.logger.log(f"⚠️ SAX Parser terminó con excepción: {e}", force=True)
+            config.logger.log(f"⚠️ Parser XML terminó con excepción: {e}", force=True)
+        
+        if not handler.total_pages_seen:
+            config.logger.log(f"❌ No se encontró ninguna <page> en {xml_path.name}: ¿dump vacío o formato no soportado?", force=True)
         
         # Finalizar con detección inteligente
         config.logger.log(f"🏁 XML TERMINADO - Iniciando finalización inteligente...", force=True)
@@ -887,12 +1281,17 @@ def main():
         config.logger.log(f"🛑 DETENIENDO WORKERS...", force=True)
         processor.stop_workers()
         
-        # Breve pausa para permitir que los workers terminen limpiamente
-        config.logger.log(f"⏳ Pausa de limpieza (2 segundos)...", force=True)
-        time.sleep(2)
+        # Unir los workers: los buffers de salida pendientes llegan a disco antes de salir
+        config.logger.log(f"⏳ Esperando a que terminen los workers...", force=True)
+        processor.join_workers()
+        
+        # Sin páginas no hay nada que evaluar: nunca reportar éxito
+        if not handler.total_pages_seen:
+            config.logger.log(f"❌ EXTRACCIÓN FALLIDA: 0 páginas procesadas", force=True)
+            return 1
         
         # Estadísticas finales
-        elapsed = time.time() - start_time
+        elapsed = time.monotonic() - start_time
         final_stats = processor.get_stats()
         
         pages_rate = handler.total_pages_seen / elapsed if elapsed > 0 else 0
@@ -915,37 +1314,9 @@ def main():
             config.logger.log(f"📊 Progreso hacia objetivo: {(pages_rate / config.target_speed) * 100:.1f}%", force=True)
         
         # Verificación final de finalización limpia
-        import threading
-        active_threads = threading.active_count()
-        if active_threads <= 5:  # Main + threads del sistema
-            config.logger.log(f"✅ FINALIZACIÓN LIMPIA - {active_threads} threads activos", force=True)
-        else:
-            config.logger.log(f"⚠️ FINALIZACIÓN PARCIAL - {active_threads} threads aún activos", force=True)
-            config.logger.log(f"🚨 Esperando 10s adicionales para limpieza...", force=True)
-            
-            # Esperar limpieza final con timeout
-            cleanup_start = time.time()
-            while time.time() - cleanup_start < 10:
-                current_threads = threading.active_count()
-                if current_threads <= 5:
-                    config.logger.log(f"✅ LIMPIEZA COMPLETADA - {current_threads} threads", force=True)
-                    break
-                time.sleep(1)
-            
-            # Si aún hay threads activos, forzar salida
-            final_threads = threading.active_count()
-            if final_threads > 5:
-                config.logger.log(f"🚨 FORZANDO SALIDA - {final_threads} threads persistentes", force=True)
-                
-                # Garbage collection final agresivo
-                import gc
-                gc.collect()
-                
-                config.logger.log(f"🚀 PROCESO TERMINANDO FORZADAMENTE...", force=True)
-                os._exit(0)  # Salida forzada sin cleanup adicional
+        config.logger.log(f"✅ FINALIZACIÓN LIMPIA - {threading.active_count()} threads activos", force=True)
         
         # Forzar garbage collection final
-        import gc
         gc.collect()
         
         config.logger.log(f"🎯 PROCESO PRINCIPAL TERMINANDO LIMPIAMENTE...", force=True)
@@ -957,7 +1328,6 @@ def main():
         return 130
     except Exception as e:
         print(f"❌ Error: {e}")
-        import traceback
         traceback.print_exc()
         return 1
 
@@ -11,7 +11,35 @@ EQUIPOS OBJETIVO:
 
 import os
 import psutil
-from typing import Dict, Any
+from typing import Dict, Any, List
+
+def get_available_cpus() -> List[int]:
+    """CPUs que este proceso puede usar (respeta cpusets de cgroups/contenedores)
+    
+    La variable de entorno WIKIDUMP_CPU_AFFINITY (p.ej. "0-15,32") restringe el conjunto sin tocar código.
+    """
+    try:
+        allowed = sorted(os.sched_getaffinity(0))
+    except AttributeError:  # Sin sched_getaffinity (macOS/Windows)
+        allowed = list(range(os.cpu_count() or 1))
+    
+    override = os.environ.get('WIKIDUMP_CPU_AFFINITY', '').strip()
+    if override:
+        try:
+            requested = set()
+            for part in override.split(','):
+                first, _, last = part.strip().partition('-')
+                requested.update(range(int(first), int(last or first) + 1))
+        except ValueError:
+            print(f"⚠️ WIKIDUMP_CPU_AFFINITY inválida ({override}), usando CPUs permitidas")
+            return allowed
+        
+        selected = [cpu for cpu in allowed if cpu in requested]
+        if selected:
+            return selected
+        print(f"⚠️ WIKIDUMP_CPU_AFFINITY ({override}) no incluye CPUs permitidas, usando todas")
+    
+    return allowed
 
 def detect_hardware() -> str:
     """Detecta automáticamente el tipo de hardware"""
@@ -48,6 +76,7 @@ def get_hardware_config(hardware_type: str = None, dataset_size_articles: int =
             'FORCE_EXIT_TIMEOUT': 15,
             'WORKER_TIMEOUT': 0.3,  # Timeout más agresivo
             'MAX_FINALIZATION_TIME': 20,
+            'AFFINITY_STRATEGY': 'reverse',  # ARM: procesos de trabajo desde los cores altos
             
             # Configuraciones específicas para manejo de colas
             'MAX_QUEUE_RETRIES': 100,  # Base para datasets normales
@@ -79,6 +108,7 @@ def get_hardware_config(hardware_type: str = None, dataset_size_articles: int =
             'FORCE_EXIT_TIMEOUT': 20,
             'WORKER_TIMEOUT': 0.2,  # Timeout ultra-agresivo
             'MAX_FINALIZATION_TIME': 30,
+            'AFFINITY_STRATEGY': 'sparse',  # x86 NUMA: alternar sockets
             
             # Configuraciones específicas para manejo de colas
             'MAX_QUEUE_RETRIES': 200,  # Base más alta para hardware premium
@@ -98,7 +128,7 @@ def get_hardware_config(hardware_type: str = None, dataset_size_articles: int =
         
         "STANDARD": {
             # ========= CONFIGURACIÓN ESTÁNDAR (fallback) =========
-            'MAX_WORKERS': min(64, os.cpu_count() * 2),
+            'MAX_WORKERS': min(64, len(get_available_cpus()) * 2),
             'BATCH_SIZE': 50000,
             'QUEUE_SIZE': 500,
             'MEMORY_BUFFER_GB': min(32, psutil.virtual_memory().total // (1024**3) // 2),
@@ -112,6 +142,7 @@ def get_hardware_config(hardware_type: str = None, dataset_size_articles: int =
             'FORCE_EXIT_TIMEOUT': 10,
             'WORKER_TIMEOUT': 1.0,
             'MAX_FINALIZATION_TIME': 15,
+            'AFFINITY_STRATEGY': 'none',  # Dejar la ubicación al scheduler del SO
             
             # Configuraciones específicas para manejo de colas
             'MAX_QUEUE_RETRIES': 30,  # Base conservadora para hardware estándar
@@ -231,7 +262,7 @@ def print_hardware_info(dataset_size: int = None):
     config = get_hardware_config(hardware_type, dataset_size)
     
     total_ram = psutil.virtual_memory().total / (1024**3)
-    cpu_count = os.cpu_count()
+    cpu_count = len(get_available_cpus())
     
     print(f"\n🖥️  INFORMACIÓN DE HARDWARE Y CONFIGURACIÓN")
     print(f"{'='*60}")
@@ -0,0 +1,23 @@
+#!/usr/bin/env python3
+"""
+🧾 JSON UTILS - Serialización JSONL compartida
+==============================================
+Un único serializador para todos los JSONL del pipeline: mismo formato compacto
+(sin espacios tras ',' y ':', UTF-8 sin escapar) con orjson o sin él.
+"""
+
+import json
+from typing import Any
+
+try:
+    import orjson  # Serialización JSONL rápida (opcional)
+except ImportError:
+    orjson = None
+
+
+if orjson is not None:
+    dumps_compact = orjson.dumps
+else:
+    def dumps_compact(record: Any) -> bytes:
+        """Serializa a bytes UTF-8 compactos, mismo formato que orjson.dumps"""
+        return json.dumps(record, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
@@ -21,7 +21,9 @@ import os
 import sys
 import time
 import argparse
+import selectors
 import subprocess
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from datetime import datetime
 import psutil
@@ -148,26 +150,47 @@ class WikidumpMainProcessor:
             
             print(f"📋 Ejecutando: {' '.join(cmd)}")
             
-            # Crear proceso para capturar salida en tiempo real
+            # Crear proceso para capturar salida en tiempo real (pipe sin buffer)
             process = subprocess.Popen(
                 cmd,
                 cwd=Path.cwd(),
                 stdout=subprocess.PIPE,
                 stderr=subprocess.STDOUT,
-                universal_newlines=True,
-                bufsize=1
+                bufsize=0
             )
             
-            # Mostrar salida en tiempo real
-            while True:
-                output = process.stdout.readline()
-                if output == '' and process.poll() is not None:
-                    break
-                if output:
-                    print(output.strip())
+            # Mostrar salida en tiempo real: esperar en el selector y leer en bloques
+            selector = selectors.DefaultSelector()
+            selector.register(process.stdout, selectors.EVENT_READ)
+            stdout_fd = process.stdout.fileno()
+            os.set_blocking(stdout_fd, False)  # Un despertar espurio nunca bloquea el read
+            pending = b''
+            out = sys.stdout.buffer
+            sys.stdout.flush()  # Vaciar la capa de texto antes de escribir bytes directamente
+            try:
+                while True:
+                    if not selector.select(timeout=1.0):
+                        continue
+                    try:
+                        chunk = os.read(stdout_fd, 1 << 20)  # Drena todo el pipe en una llamada
+                    except BlockingIOError:
+                        continue
+                    if not chunk:  # EOF: el proceso cerró su salida
+                        break
+                    pending += chunk
+                    *lines, pending = pending.split(b'\n')
+                    if lines:
+                        # Una sola escritura + flush por bloque leído (no un print por línea)
+                        out.write(b''.join(line.strip() + b'\n' for line in lines))
+                        out.flush()
+                if pending:
+                    out.write(pending.strip() + b'\n')
+                    out.flush()
+            finally:
+                selector.close()
             
             # Esperar que termine y obtener código de salida
-            return_code = process.poll()
+            return_code = process.wait()
             
             elapsed = time.time() - start_time
             
@@ -191,7 +214,10 @@ class WikidumpMainProcessor:
             print(f"❌ Directorio de Stage 1 no existe: {self.stage1_output}")
             return False
             
-        jsonl_files = list(self.stage1_output.glob("articles_hybrid_*.jsonl"))
+        with os.scandir(self.stage1_output) as entries:
+            jsonl_files = [entry for entry in entries
+                           if entry.name.startswith('articles_hybrid_') and entry.name.endswith('.jsonl')
+                           and entry.is_file(follow_symlinks=False)]
         if not jsonl_files:
             print(f"❌ No se encontraron archivos JSONL en {self.stage1_output}")
             return False
@@ -235,19 +261,25 @@ class WikidumpMainProcessor:
         print(f"   🏷️ Categorías: {'✅' if categories_dir.exists() else '❌'}")
         print(f"   🧠 Consciencia: {'✅' if consciencia_dir.exists() else '❌'}")
         
-        # Contar conversaciones totales
+        # Contar conversaciones totales (archivos independientes, I/O en paralelo)
         total_conversations = 0
-        for file in conversation_files:
-            try:
-                with open(file, 'r', encoding='utf-8') as f:
-                    total_conversations += sum(1 for line in f if line.strip())
-            except:
-                pass
+        if conversation_files:
+            with ThreadPoolExecutor(max_workers=min(8, len(conversation_files))) as executor:
+                total_conversations = sum(executor.map(self._count_jsonl_lines, conversation_files))
         
         print(f"   � Total conversaciones: {total_conversations:,}")
         
         return len(conversation_files) > 0
     
+    @staticmethod
+    def _count_jsonl_lines(path: Path) -> int:
+        """Cuenta líneas JSONL (una por conversación) en bloques de 1MB sin decodificar"""
+        try:
+            with open(path, 'rb') as f:
+                return sum(chunk.count(b'\n') for chunk in iter(lambda: f.read(1 << 20), b''))
+        except:
+            return 0
+    
     def print_final_summary(self, total_time: float, stage1_success: bool, stage2_success: bool):
         """Imprime resumen final del procesamiento"""
         print("\n" + "="*80)
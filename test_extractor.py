@@ -0,0 +1,20 @@
+#!/usr/bin/env python3
+"""Pruebas de la limpieza de wikitexto del extractor"""
+
+import pytest
+
+from extractor import clean_wikitext
+
+
+@pytest.mark.parametrize('text, expected', [
+    ('Texto con [[enlace]] simple', 'Texto con enlace simple'),
+    ('Según [[Madrid|la capital]] de España', 'Según la capital de España'),
+    ('Antes {{cita|x}} después<ref>nota</ref> fin', 'Antes después fin'),
+    ('Salto\n\nde   línea <br/> y\ttab ', 'Salto de línea y tab'),
+    # Refs con enlaces externos dentro del texto de un enlace (pies de imagen)
+    ('[[Archivo:X.jpg|miniatura|Texto<ref>[http://a.b c]</ref>]] fin', 'miniatura|Texto fin'),
+    ('Según [[INE|el instituto<ref>[http://ine.es INE]</ref>]] hay', 'Según el instituto hay'),
+    ('[[París|la ciudad{{nota|[1]}}]] es', 'la ciudad es'),
+])
+def test_clean_wikitext(text, expected):
+    assert clean_wikitext(text) == expected